@@ -4,16 +4,17 @@ A special cog to handle the special cases for this channel.
 """
 import os
 import re
+import heapq
 import logging
 import asyncio
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta
 import discord
 from discord.ext import commands
 from redbot.core import Config, checks, commands, data_manager
 from redbot.core.bot import Red
 from redbot.core.commands.context import Context
-from redbot.core.utils.chat_formatting import humanize_timedelta
+from redbot.core.utils.chat_formatting import humanize_timedelta, pagify
 
 # Basic constants
 AH_CHANNEL = "after-hours"
@@ -23,6 +24,8 @@ KEY_ROLE_ID = "roleId"
 STARBOARD = "highlights"
 DELETE_TIME = 32 * 60 * 60
 SLEEP_TIME = 60 * 60
+FLUSH_TIME = 5 * 60  # How often to save message timestamps to config, in seconds
+MAX_CONCURRENT_PURGES = 5  # Max number of role removals in flight at once
 
 # Logging
 KEY_LAST_MSG_TIMESTAMPS = "lastMsgTimestamps"
@@ -63,150 +66,323 @@ class AfterHours(commands.Cog):
                 logging.Formatter("%(asctime)s %(message)s", datefmt="[%d/%m/%Y %H:%M:%S]")
             )
             self.logger.addHandler(handler)
+
+        # Guild ID -> IDs of the AfterHours channels, loaded from config on first use.
+        self.trackedChannels: Dict[int, Set[int]] = {}
+        # Guild ID -> member ID -> last message timestamp, not yet saved to config.
+        self.pendingTimestamps: Dict[int, Dict[str, float]] = {}
+        # Heap of (expiry timestamp, guild ID, channel ID) of AfterHours channels.
+        self.expiryHeap: List[Tuple[float, int, int]] = []
+        self.expiryEvent = asyncio.Event()
+
         self.bgTask = self.bot.loop.create_task(self.backgroundLoop())
+        self.gcTask = self.bot.loop.create_task(self.garbageCollectLoop())
+        self.flushTask = self.bot.loop.create_task(self.flushLoop())
 
     # Cancel the background task on cog unload.
     def __unload(self):  # pylint: disable=invalid-name
         self.logger.info("Unloading cog")
         self.bgTask.cancel()
+        self.gcTask.cancel()
+        self.flushTask.cancel()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.logger.info("Unloading cog")
         self.__unload()
+        await self.flushMessageTimestamps()
 
     async def backgroundLoop(self):
-        """Background loop to garbage collect and purge"""
+        """Background loop to purge"""
         while True:
-            self.logger.debug("Checking to see if we need to garbage collect")
-            await self.checkGarbageCollect()
-
             self.logger.debug("Executing auto-purge")
             await self.doAutoPurge()
 
             await asyncio.sleep(SLEEP_TIME)
 
-    async def checkGarbageCollect(self):
-        for guild in self.bot.guilds:
-            self.logger.debug("Checking guild %s", guild.id)
-            async with self.config.guild(guild).get_attr(KEY_CHANNEL_IDS)() as channels:
-                staleIds = []
-                for channelId, data in channels.items():
-                    self.logger.debug("Checking channel ID %s", channelId)
-                    channel = discord.utils.get(guild.channels, id=int(channelId))
-                    if not channel:
-                        self.logger.error("Channel ID %s doesn't exist!", channelId)
-                        staleIds.append(channelId)
-                        continue
-                    creationTime = datetime.fromtimestamp(data["time"])
-                    self.logger.debug("Time difference = %s", datetime.now() - creationTime)
-                    if datetime.now() - creationTime > timedelta(seconds=DELETE_TIME):
-                        try:
-                            await channel.delete(reason="AfterHours purge")
-                        except discord.Forbidden:
-                            self.logger.error(
-                                "Could not delete channel %s (%s) because "
-                                "the bot doesn't have enough permissions!",
-                                channel.name,
-                                channel.id,
-                                exc_info=True,
-                            )
-                        else:
-                            self.logger.info("Deleted channel %s (%s)", channel.name, channel.id)
-
-                        # Don't delete the ID here, this will be taken care of in
-                        # the delete listener
-                for channelId in staleIds:
-                    self.logger.info("Purging stale channel ID %s", channelId)
-                    del channels[channelId]
+    async def flushLoop(self):
+        """Background loop to periodically save message timestamps to config."""
+        while True:
+            await asyncio.sleep(FLUSH_TIME)
+            try:
+                await self.flushMessageTimestamps()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.error("Could not save message timestamps", exc_info=True)
 
-    async def doAutoPurge(self, forced=False):
-        for guild in self.bot.guilds:
-            guildConfig = self.config.guild(guild)
-            autoPurgeConfig = guildConfig.get_attr(KEY_AUTO_PURGE)
-            autoPurgeInactiveDurationConfig = autoPurgeConfig.get_attr(KEY_INACTIVE_DURATION)
+    async def flushMessageTimestamps(self):
+        """Save all pending message timestamps to config.
 
-            if not forced and await autoPurgeConfig.get_attr(KEY_BACKGROUND_LOOP)() is False:
+        If saving fails, the timestamps that were not saved are kept for the next try.
+        """
+        pending, self.pendingTimestamps = self.pendingTimestamps, {}
+        try:
+            for guildId in list(pending):
+                timestamps = pending[guildId]
                 self.logger.debug(
-                    "Background execution of auto-purged is disabled for guild %s", guild.id
+                    "Saving %s message timestamps for guild %s", len(timestamps), guildId
                 )
-                continue
+                guildConfig = self.config.guild_from_id(guildId)
+                async with guildConfig.get_attr(KEY_LAST_MSG_TIMESTAMPS)() as lastMsgTimestamps:
+                    lastMsgTimestamps.update(timestamps)
+                del pending[guildId]
+        finally:
+            # Messages sent while saving are newer, so they take precedence.
+            for guildId, timestamps in pending.items():
+                newTimestamps = self.pendingTimestamps.setdefault(guildId, {})
+                for memberId, timestamp in timestamps.items():
+                    newTimestamps.setdefault(memberId, timestamp)
+
+    async def getTrackedChannels(self, guild: discord.Guild) -> Set[int]:
+        """Get the IDs of the AfterHours channels in a guild.
+
+        This is cached, and should be invalidated with `self.trackedChannels.pop`
+        whenever the channel IDs in config change.
+        """
+        channels = self.trackedChannels.get(guild.id)
+        if channels is None:
+            channelIds = await self.config.guild(guild).get_attr(KEY_CHANNEL_IDS)()
+            channels = {int(channelId) for channelId in channelIds}
+            self.trackedChannels[guild.id] = channels
+        return channels
 
-            # skip this guild if there is no AfterHours role
-            ahRoleId: int = await guildConfig.get_attr(KEY_ROLE_ID)()
-            if not ahRoleId:
-                self.logger.debug("No AfterHours role ID set for guild %s", guild.id)
-                continue
-            else:
-                ahRole: discord.Role = discord.utils.get(guild.roles, id=int(ahRoleId))
-                if not ahRole:
-                    self.logger.debug("AfterHours role does not exist in guild %s!", guild.id)
-                    continue
+    def scheduleChannelExpiry(self, guildId: int, channelId: int, creationTime: float):
+        """Schedule an AfterHours channel to be deleted once it expires.
 
-            # a list of members to be purged
-            inactiveMembers: List[Tuple[discord.Member, datetime]] = []
+        Parameters
+        ----------
+        guildId: int
+            The ID of the guild the channel is in.
+        channelId: int
+            The ID of the channel.
+        creationTime: float
+            The POSIX timestamp of when the channel was created.
+        """
+        heapq.heappush(self.expiryHeap, (creationTime + DELETE_TIME, guildId, channelId))
+        self.expiryEvent.set()
 
-            # check for inactive members based on a set inactive duration
-            inactiveDuration: int = await autoPurgeInactiveDurationConfig()
+    async def garbageCollectLoop(self):
+        """Background loop to delete AfterHours channels when they expire.
 
-            inactiveDurationTimeDelta = timedelta(seconds=inactiveDuration)
+        This sleeps until the earliest channel expiry, or until a new channel is
+        scheduled.
+        """
+        await self.bot.wait_until_ready()
+        for guildId, guildData in (await self.config.all_guilds()).items():
+            for channelId, data in guildData.get(KEY_CHANNEL_IDS, {}).items():
+                self.scheduleChannelExpiry(guildId, int(channelId), data["time"])
 
-            if not inactiveDurationTimeDelta or inactiveDurationTimeDelta < timedelta(seconds=1):
-                self.logger.debug(
-                    "Auto-purge based on inactive duration is not enabled for guild %s", guild.id
-                )
-                continue
+        while True:
+            self.expiryEvent.clear()
+            timeout = None
+            if self.expiryHeap:
+                timeout = max(self.expiryHeap[0][0] - datetime.now().timestamp(), 0)
+            try:
+                await asyncio.wait_for(self.expiryEvent.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            now = datetime.now().timestamp()
+            while self.expiryHeap and self.expiryHeap[0][0] <= now:
+                _, guildId, channelId = heapq.heappop(self.expiryHeap)
+                try:
+                    await self.garbageCollectChannel(guildId, channelId)
+                except Exception:  # pylint: disable=broad-except
+                    self.logger.error(
+                        "Could not garbage collect channel ID %s", channelId, exc_info=True
+                    )
 
-            self.logger.debug(
-                "Auto-purge based on inactive duration is enabled for guild %s (inactive duration %s)",
-                guild.id,
-                inactiveDurationTimeDelta,
-            )
+    async def garbageCollectChannel(self, guildId: int, channelId: int):
+        """Delete an expired AfterHours channel.
 
-            async with guildConfig.get_attr(KEY_LAST_MSG_TIMESTAMPS)() as lastMsgTimestamps:
-                for member in ahRole.members:
-                    if not member.bot:
-                        memberId = str(member.id)
-                        if memberId in lastMsgTimestamps:
-                            lastMsgTime = datetime.fromtimestamp(lastMsgTimestamps[memberId])
-                            if datetime.now() - lastMsgTime > inactiveDurationTimeDelta:
-                                inactiveMembers.append((member, lastMsgTime))
-                        else:
-                            self.logger.debug(
-                                "Member %s has no AfterHours message timestamp recorded, "
-                                "therefore assuming the last message timestamp is right now",
-                                memberId,
-                            )
-                            lastMsgTimestamps[memberId] = datetime.now().timestamp()
-
-            # purge inactive members
-            try:
-                async with guildConfig.get_attr(KEY_LAST_MSG_TIMESTAMPS)() as lastMsgTimestamps:
-                    for inactiveMember, lastMsgTime in inactiveMembers:
-                        # obtain information
-                        memberName = inactiveMember.name
-                        memberDiscriminator = inactiveMember.discriminator
-                        memberId = str(inactiveMember.id)
-                        # purge this inactive member
-                        await inactiveMember.remove_roles(ahRole, reason="AfterHours auto-purge")
-                        self.logger.info(
-                            "Removed role %s from %s#%s (%s) due to inactivity. Last message time: %s (%s)",
-                            ahRole.name,
-                            memberName,
-                            memberDiscriminator,
-                            memberId,
-                            lastMsgTime.timestamp(),
-                            lastMsgTime.strftime("%d/%m/%Y %H:%M:%S"),
-                        )
-                        # clean up dict entry for this member
-                        del lastMsgTimestamps[memberId]
-            except discord.Forbidden:
+        Parameters
+        ----------
+        guildId: int
+            The ID of the guild the channel is in.
+        channelId: int
+            The ID of the channel.
+        """
+        guild = self.bot.get_guild(guildId)
+        if not guild:
+            return
+
+        if channelId not in await self.getTrackedChannels(guild):
+            # Already deleted.
+            return
+
+        self.logger.debug("Checking channel ID %s", channelId)
+        channel = guild.get_channel(channelId)
+        if not channel:
+            self.logger.error("Channel ID %s doesn't exist!", channelId)
+            self.logger.info("Purging stale channel ID %s", channelId)
+            async with self.config.guild(guild).get_attr(KEY_CHANNEL_IDS)() as channels:
+                channels.pop(str(channelId), None)
+            self.trackedChannels.pop(guild.id, None)
+            return
+
+        try:
+            await channel.delete(reason="AfterHours purge")
+        except discord.HTTPException as error:
+            if isinstance(error, discord.Forbidden):
                 self.logger.error(
-                    "Auto-purge failed due to missing permissions for guild %s", guild.id
+                    "Could not delete channel %s (%s) because "
+                    "the bot doesn't have enough permissions!",
+                    channel.name,
+                    channel.id,
+                    exc_info=True,
                 )
-            except discord.HTTPException:
+            else:
                 self.logger.error(
-                    "Auto-purge failed due to HTTP error for guild %s", guild.id, exc_info=True
+                    "Could not delete channel %s (%s)", channel.name, channel.id, exc_info=True
                 )
+            # Try again later, in case permissions get fixed or Discord recovers.
+            heapq.heappush(
+                self.expiryHeap, (datetime.now().timestamp() + SLEEP_TIME, guildId, channelId)
+            )
+        else:
+            self.logger.info("Deleted channel %s (%s)", channel.name, channel.id)
+
+        # Don't delete the ID here, this will be taken care of in
+        # the delete listener
+
+    async def doAutoPurge(self, forced=False):
+        # Make sure purging sees the latest message timestamps.
+        await self.flushMessageTimestamps()
+
+        for guild in self.bot.guilds:
+            await self.autoPurgeGuild(guild, forced=forced)
+
+    async def autoPurgeGuild(
+        self, guild: discord.Guild, forced=False, dryRun=False
+    ) -> List[Tuple[discord.Member, datetime]]:
+        """Remove the AfterHours role from inactive members of a guild.
+
+        The inactive members are found first, and then the role is removed from them
+        with a bounded number of concurrent requests. Failing to remove the role from
+        one member does not stop the others. Message timestamps are updated in a
+        single config write at the end.
+
+        Parameters
+        ----------
+        guild: discord.Guild
+            The guild to purge.
+        forced: bool
+            Purge even if background auto-purge is disabled for this guild.
+        dryRun: bool
+            Only find the inactive members, without removing roles or saving anything.
+
+        Returns
+        -------
+        List[Tuple[discord.Member, datetime]]
+            The members that were purged (or would be, on a dry run), along with the
+            time of their last message.
+        """
+        guildConfig = self.config.guild(guild)
+        autoPurgeConfig = guildConfig.get_attr(KEY_AUTO_PURGE)
+        autoPurgeInactiveDurationConfig = autoPurgeConfig.get_attr(KEY_INACTIVE_DURATION)
+
+        if not forced and await autoPurgeConfig.get_attr(KEY_BACKGROUND_LOOP)() is False:
+            self.logger.debug(
+                "Background execution of auto-purged is disabled for guild %s", guild.id
+            )
+            return []
+
+        # skip this guild if there is no AfterHours role
+        ahRoleId: int = await guildConfig.get_attr(KEY_ROLE_ID)()
+        if not ahRoleId:
+            self.logger.debug("No AfterHours role ID set for guild %s", guild.id)
+            return []
+        ahRole: discord.Role = guild.get_role(int(ahRoleId))
+        if not ahRole:
+            self.logger.debug("AfterHours role does not exist in guild %s!", guild.id)
+            return []
+
+        # check for inactive members based on a set inactive duration
+        inactiveDuration: int = await autoPurgeInactiveDurationConfig()
+
+        inactiveDurationTimeDelta = timedelta(seconds=inactiveDuration)
+
+        if not inactiveDurationTimeDelta or inactiveDurationTimeDelta < timedelta(seconds=1):
+            self.logger.debug(
+                "Auto-purge based on inactive duration is not enabled for guild %s", guild.id
+            )
+            return []
+
+        self.logger.debug(
+            "Auto-purge based on inactive duration is enabled for guild %s (inactive duration %s)",
+            guild.id,
+            inactiveDurationTimeDelta,
+        )
+
+        # a list of members to be purged
+        inactiveMembers: List[Tuple[discord.Member, datetime]] = []
+        # timestamps to record for members that have none
+        newTimestamps: Dict[str, float] = {}
+
+        lastMsgTimestamps = await guildConfig.get_attr(KEY_LAST_MSG_TIMESTAMPS)()
+        now = datetime.now()
+        for member in ahRole.members:
+            if not member.bot:
+                memberId = str(member.id)
+                if memberId in lastMsgTimestamps:
+                    lastMsgTime = datetime.fromtimestamp(lastMsgTimestamps[memberId])
+                    if now - lastMsgTime > inactiveDurationTimeDelta:
+                        inactiveMembers.append((member, lastMsgTime))
+                else:
+                    self.logger.debug(
+                        "Member %s has no AfterHours message timestamp recorded, "
+                        "therefore assuming the last message timestamp is right now",
+                        memberId,
+                    )
+                    newTimestamps[memberId] = now.timestamp()
+
+        if dryRun:
+            return inactiveMembers
+
+        # purge inactive members
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PURGES)
+
+        async def purgeMember(inactiveMember: discord.Member, lastMsgTime: datetime) -> bool:
+            async with semaphore:
+                try:
+                    await inactiveMember.remove_roles(ahRole, reason="AfterHours auto-purge")
+                except discord.Forbidden:
+                    self.logger.error(
+                        "Auto-purge of %s failed due to missing permissions for guild %s",
+                        inactiveMember.id,
+                        guild.id,
+                    )
+                    return False
+                except discord.HTTPException:
+                    self.logger.error(
+                        "Auto-purge of %s failed due to HTTP error for guild %s",
+                        inactiveMember.id,
+                        guild.id,
+                        exc_info=True,
+                    )
+                    return False
+            self.logger.info(
+                "Removed role %s from %s#%s (%s) due to inactivity. Last message time: %s (%s)",
+                ahRole.name,
+                inactiveMember.name,
+                inactiveMember.discriminator,
+                inactiveMember.id,
+                lastMsgTime.timestamp(),
+                lastMsgTime.strftime("%d/%m/%Y %H:%M:%S"),
+            )
+            return True
+
+        results = await asyncio.gather(
+            *(purgeMember(member, lastMsgTime) for member, lastMsgTime in inactiveMembers)
+        )
+        purgedMembers = [inactive for inactive, purged in zip(inactiveMembers, results) if purged]
+
+        if newTimestamps or purgedMembers:
+            async with guildConfig.get_attr(KEY_LAST_MSG_TIMESTAMPS)() as lastMsgTimestamps:
+                lastMsgTimestamps.update(newTimestamps)
+                # clean up dict entries for purged members
+                for purgedMember, _ in purgedMembers:
+                    lastMsgTimestamps.pop(str(purgedMember.id), None)
+
+        return purgedMembers
 
     async def getContext(self, channel: discord.TextChannel):
         """Get the Context object from a text channel.
@@ -338,8 +514,11 @@ class AfterHours(commands.Cog):
             await self.makeHighlightChanges(ctx, channel)
             await self.makeStarboardChanges(ctx, channel)
             await self.makeWordFilterChanges(ctx, channel)
+            creationTime = datetime.now().timestamp()
             async with self.config.guild(channel.guild).get_attr(KEY_CHANNEL_IDS)() as channelIds:
-                channelIds[channel.id] = {"time": datetime.now().timestamp()}
+                channelIds[channel.id] = {"time": creationTime}
+            self.trackedChannels.pop(channel.guild.id, None)
+            self.scheduleChannelExpiry(channel.guild.id, channel.id, creationTime)
 
     @commands.Cog.listener("on_guild_channel_delete")
     async def handleChannelDelete(self, channel: discord.abc.GuildChannel):
@@ -362,16 +541,17 @@ class AfterHours(commands.Cog):
                 await self.makeStarboardChanges(ctx, channel, remove=True)
                 await self.makeWordFilterChanges(ctx, channel, remove=True)
                 del channelIds[str(channel.id)]
+                self.trackedChannels.pop(channel.guild.id, None)
 
     async def saveMessageTimestamp(self, message: discord.Message, timestamp: float):
-        guildConfig = self.config.guild(message.guild)
+        """Record the timestamp of a message in an AfterHours channel.
 
-        async with guildConfig.get_attr(KEY_CHANNEL_IDS)() as channels:
-            if str(message.channel.id) not in channels:
-                return
+        The timestamp is kept in memory, and saved to config by the flush loop.
+        """
+        if message.channel.id not in await self.getTrackedChannels(message.guild):
+            return
 
-            async with guildConfig.get_attr(KEY_LAST_MSG_TIMESTAMPS)() as lastMsgTimestamps:
-                lastMsgTimestamps[message.author.id] = timestamp
+        self.pendingTimestamps.setdefault(message.guild.id, {})[str(message.author.id)] = timestamp
 
     @commands.Cog.listener("on_message")
     async def handleMessage(self, message: discord.Message):
@@ -478,6 +658,26 @@ class AfterHours(commands.Cog):
         await self.doAutoPurge(forced=True)
         await ctx.send("Purge completed!")
 
+    @checks.mod()
+    @afterHoursAutoPurge.command(name="dryrun")
+    async def afterHoursAutoPurgeDryRun(self, ctx: Context):
+        """Show who would be purged, without removing any roles"""
+        await self.flushMessageTimestamps()
+        inactiveMembers = await self.autoPurgeGuild(ctx.guild, forced=True, dryRun=True)
+        if not inactiveMembers:
+            await ctx.send("No members would be purged.")
+            return
+
+        inactiveMembers.sort(key=lambda inactive: inactive[1])
+        lines = [f"{len(inactiveMembers)} members would be purged:"]
+        for member, lastMsgTime in inactiveMembers:
+            lines.append(
+                f"{member.display_name} ({member.id}), last message "
+                f"{lastMsgTime.strftime('%d/%m/%Y %H:%M:%S')}"
+            )
+        for page in pagify("\n".join(lines)):
+            await ctx.send(page)
+
     @checks.admin()
     @afterHoursAutoPurge.command(name="togglebackground")
     async def afterHoursAutoPurgeToggleBackgroundLoop(self, ctx: Context):
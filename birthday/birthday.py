@@ -3,11 +3,12 @@ birthday."""
 import logging
 import os
 from random import choice
-import time  # To auto remove birthday role on the next day.
 import asyncio
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta, tzinfo
+from functools import partial
 import discord
-from typing import Union
+from dateutil.tz import gettz
+from typing import Dict, Iterable, List, Optional, Union
 from redbot.core import Config, checks, commands, data_manager
 from redbot.core.commands.context import Context
 from redbot.core.utils import AsyncIter
@@ -16,6 +17,7 @@ from redbot.core.utils.chat_formatting import bold, pagify, spoiler, warning
 from redbot.core.bot import Red
 from .constants import *
 from .converters import MonthDayConverter
+from .helpers import BirthdayIndex, runBounded
 
 
 class Birthday(commands.Cog):
@@ -40,8 +42,6 @@ class Birthday(commands.Cog):
             self.logger.addHandler(handler)
 
     def initializeBgTask(self):
-        # On cog load, we want the loop to run once.
-        self.lastChecked = datetime.now() - timedelta(days=1)
         self.bgTask = self.bot.loop.create_task(self.birthdayLoop())
 
     # Class constructor
@@ -49,8 +49,13 @@ class Birthday(commands.Cog):
         self.bot = bot
         self.bgTask: asyncio.Task = None
         self.config: Config = None
-        self.lastChecked: datetime = None
         self.logger: logging.Logger = None
+        self.index = BirthdayIndex()
+        # Guild ID -> timezone name, for guilds that do not use the bot's local time.
+        self.timezones: Dict[int, str] = {}
+        # (guild ID, member ID) of members with a role change in flight.
+        self.pendingMembers = set()
+        self.wakeEvent = asyncio.Event()
 
         self.initializeConfigAndLogger()
         self.initializeBgTask()
@@ -125,6 +130,47 @@ class Birthday(commands.Cog):
             "as the birthday role!".format(role.name)
         )
 
+    @_birthday.command(name="timezone", aliases=["tz"])
+    @commands.guild_only()
+    @checks.mod_or_permissions(administrator=True)
+    async def setTimezone(self, ctx: Context, timezone: str = None):
+        """Set the timezone used to determine when a birthday starts and ends.
+
+        Parameters:
+        -----------
+        timezone: Optional[str]
+            A timezone name, such as America/Vancouver. If not specified, the
+            bot's local time is used.
+        """
+        if timezone and not gettz(timezone):
+            await ctx.send(
+                ":negative_squared_cross_mark: **Birthday - Timezone**: "
+                "**{}** is not a valid timezone!".format(timezone)
+            )
+            return
+
+        await self.config.guild(ctx.guild).get_attr(KEY_TIMEZONE).set(timezone)
+        if timezone:
+            self.timezones[ctx.guild.id] = timezone
+        else:
+            self.timezones.pop(ctx.guild.id, None)
+        self.wakeEvent.set()
+
+        self.logger.info(
+            "%s#%s (%s) set the birthday timezone to %s",
+            ctx.author.name,
+            ctx.author.discriminator,
+            ctx.author.id,
+            timezone or "local time",
+        )
+        await ctx.send(
+            ":white_check_mark: **Birthday - Timezone**: Birthdays will now follow "
+            "**{}**.".format(timezone or "the bot's local time")
+        )
+
+        # The day may have changed for this guild.
+        await self.checkBirthday([ctx.guild.id])
+
     @_birthday.command(name="test")
     @commands.guild_only()
     @checks.mod_or_permissions(administrator=True)
@@ -197,6 +243,7 @@ class Birthday(commands.Cog):
 
             userConfig[KEY_BDAY_MONTH] = month
             userConfig[KEY_BDAY_DAY] = day
+        self.index.set(ctx.guild.id, member.id, month, day)
 
         confMsg = await ctx.send(
             ":white_check_mark: **Birthday - Add**: Successfully {0} **{1}**'s birthday "
@@ -206,7 +253,7 @@ class Birthday(commands.Cog):
 
         # Explicitly check to see if user should be added to role, if the month
         # and day just so happen to be the same as it is now.
-        await self.checkBirthday()
+        await self.checkBirthday([ctx.guild.id])
 
         await asyncio.sleep(5)  # pylint: disable=no-member
 
@@ -331,6 +378,7 @@ class Birthday(commands.Cog):
             return
 
         await self.config.member(member).get_attr(KEY_IS_ASSIGNED).set(False)
+        self.index.setAssigned(ctx.guild.id, member.id, False)
 
         await ctx.send(
             ":white_check_mark: **Birthday - Unassign**: Successfully "
@@ -396,6 +444,8 @@ class Birthday(commands.Cog):
             userConfig[KEY_IS_ASSIGNED] = False
             userConfig[KEY_BDAY_MONTH] = None
             userConfig[KEY_BDAY_DAY] = None
+        self.index.remove(ctx.guild.id, member.id)
+        self.index.setAssigned(ctx.guild.id, member.id, False)
 
         await ctx.send(
             ":white_check_mark: **Birthday - Delete**: Deleted birthday of **{}** ".format(
@@ -592,6 +642,7 @@ class Birthday(commands.Cog):
                 await birthdayConfig.get_attr(KEY_BDAY_MONTH).set(birthday.month)
                 await birthdayConfig.get_attr(KEY_BDAY_DAY).set(birthday.day)
                 await birthdayConfig.get_attr(KEY_ADDED_BEFORE).set(True)
+                self.index.set(ctx.guild.id, ctx.author.id, birthday.month, birthday.day)
 
                 await channel.send(
                     f"{headerGood}: Successfully set your birthday to "
@@ -609,7 +660,7 @@ class Birthday(commands.Cog):
 
                 # explicitly check to see if the role should be applied to the user
                 # if the month and day just so happen to be the same as it is now.
-                await self.checkBirthday()
+                await self.checkBirthday([ctx.guild.id])
                 return
 
             noDmStr = "\n".join(
@@ -671,6 +722,31 @@ class Birthday(commands.Cog):
             await allowSelfBirthdayConfig.set(True)
             await ctx.send(msgAllow)
 
+    @_birthday.command(name="groupannounce")
+    @commands.guild_only()
+    @checks.mod_or_permissions(administrator=True)
+    async def toggleGroupAnnouncement(self, ctx: Context):
+        """Toggle announcing all of the day's birthdays in a single message.
+
+        If enabled, members whose birthdays are on the same day are mentioned
+        together, instead of getting one message each.
+        """
+        fnTitle = "Birthday - Toggle Group Announcement"
+        headerGood = f":white_check_mark: {bold(fnTitle)}"
+
+        groupAnnounceConfig = self.config.guild(ctx.guild).get_attr(KEY_GROUP_ANNOUNCE)
+        if await groupAnnounceConfig():
+            await groupAnnounceConfig.set(False)
+            await ctx.send(
+                f"{headerGood}: {bold('Disabled')}. Each birthday will be announced separately."
+            )
+        else:
+            await groupAnnounceConfig.set(True)
+            await ctx.send(
+                f"{headerGood}: {bold('Enabled')}. Birthdays on the same day will be "
+                "announced in a single message."
+            )
+
     def getBirthdayMessage(self, member: discord.Member) -> str:
         """Get the birthday message.
 
@@ -688,25 +764,131 @@ class Birthday(commands.Cog):
             return BOT_BIRTHDAY_MSG
         return choice(CANNED_MESSAGES).format(member.mention)
 
-    async def checkBirthday(self):
-        """Check birthday list once."""
-        await self._dailySweep()
-        await self._dailyAdd()
+    def getGroupBirthdayMessages(self, members: List[discord.Member]) -> List[str]:
+        """Get the birthday messages for several members at once.
+
+        Parameters
+        ----------
+        members: List[discord.Member]
+            The members that we want the birthday message for.
+
+        Returns
+        -------
+        List[str]
+            The birthday messages, already formatted. There is more than one message
+            only if the mentions do not fit into a single message.
+        """
+        if len(members) == 1:
+            return [self.getBirthdayMessage(members[0])]
+        mentions = ", ".join(member.mention for member in members)
+        return list(
+            pagify(GROUP_BIRTHDAY_MSG.format(mentions), delims=[" "], page_length=MAX_MSG_LEN)
+        )
+
+    def getTimezone(self, guildId: int) -> Optional[tzinfo]:
+        """Get the timezone of a guild.
+
+        Returns
+        -------
+        Optional[tzinfo]
+            The guild's timezone, or None if the guild uses the bot's local time.
+        """
+        timezone = self.timezones.get(guildId)
+        return gettz(timezone) if timezone else None
+
+    def getToday(self, guildId: int) -> date:
+        """Get the current date in a guild's timezone."""
+        return datetime.now(self.getTimezone(guildId)).date()
+
+    def getNextMidnight(self, timezone: Optional[str]) -> float:
+        """Get the next midnight in a timezone.
+
+        Parameters
+        ----------
+        timezone: Optional[str]
+            The timezone name, or None for the bot's local time.
+
+        Returns
+        -------
+        float
+            The POSIX timestamp of the next midnight.
+        """
+        tz = gettz(timezone) if timezone else None
+        tomorrow = datetime.now(tz).date() + timedelta(days=1)
+        return datetime.combine(tomorrow, time(), tzinfo=tz).timestamp()
+
+    async def checkBirthday(self, guildIds: Optional[Iterable[int]] = None):
+        """Check birthday list once.
+
+        Parameters
+        ----------
+        guildIds: Optional[Iterable[int]]
+            The IDs of the guilds to check. If not specified, all guilds are checked.
+        """
+        if guildIds is not None:
+            guildIds = set(guildIds)
+        await self._dailySweep(guildIds)
+        await self._dailyAdd(guildIds)
 
     async def birthdayLoop(self):
-        """The main event loop that will call the add and sweep methods."""
+        """The main event loop that will call the add and sweep methods.
+
+        This sleeps until the next midnight of any timezone in use, and then only
+        checks the guilds whose day has rolled over.
+        """
         self.logger.info("Waiting for bot to be ready")
         await self.bot.wait_until_red_ready()
         self.logger.info("Bot is ready")
+        self.index.rebuild(await self.config.all_members())
+        for guildId, guildData in (await self.config.all_guilds()).items():
+            if guildData.get(KEY_TIMEZONE):
+                self.timezones[guildId] = guildData[KEY_TIMEZONE]
+
+        # On cog load, we want the loop to run once.
+        await self.checkBirthday()
+
         while self == self.bot.get_cog("Birthday"):
-            if self.lastChecked.day != datetime.now().day:
-                self.lastChecked = datetime.now()
-                await self.checkBirthday()
-            await asyncio.sleep(60)  # pylint: disable=no-member
+            # Guilds without a timezone use the bot's local time.
+            deadlines = {None: self.getNextMidnight(None)}
+            for timezone in set(self.timezones.values()):
+                deadlines[timezone] = self.getNextMidnight(timezone)
+
+            self.wakeEvent.clear()
+            timeout = max(min(deadlines.values()) - datetime.now().timestamp(), 0)
+            try:
+                await asyncio.wait_for(self.wakeEvent.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            now = datetime.now().timestamp()
+            dueTimezones = {
+                timezone for timezone, deadline in deadlines.items() if deadline <= now
+            }
+            if not dueTimezones:
+                # Woken up by a settings change, re-plan.
+                continue
+            guildIds = [
+                guild.id
+                for guild in self.bot.guilds
+                if self.timezones.get(guild.id) in dueTimezones
+            ]
+            self.logger.debug("Checking birthdays for %s guilds", len(guildIds))
+            await self.checkBirthday(guildIds)
 
-    async def _dailySweep(self):
-        """Check to see if any users should have the birthday role removed."""
-        guilds = self.bot.guilds
+    async def _dailySweep(self, guildIds: Optional[set] = None):
+        """Check to see if any users should have the birthday role removed.
+
+        The members to update are collected while holding the members lock, but the
+        role changes are made after releasing it, so that slow requests do not block
+        other commands.
+
+        Parameters
+        ----------
+        guildIds: Optional[set]
+            The IDs of the guilds to check. If not specified, all guilds are checked.
+        """
+        bdayRoleIds = {}
+        work = []  # (member, role)
 
         # Avoid having data modified by other methods.
         # When we acquire the lock for all members, it also prevents lock for guild
@@ -714,53 +896,126 @@ class Birthday(commands.Cog):
         membersLock = self.config.get_members_lock()
 
         async with membersLock:
-            # Check each guild.
-            for guild in guilds:
+            # Only members that currently have the role need to be checked.
+            for guildId, memberId in self.index.getAssigned():
+                if guildIds is not None and guildId not in guildIds:
+                    continue
+                if (guildId, memberId) in self.pendingMembers:
+                    continue
+
+                # If the date is different than the date assigned, remove role.
+                today = self.getToday(guildId)
+                if self.index.getBirthday(guildId, memberId) == (today.month, today.day):
+                    continue
+
+                guild = self.bot.get_guild(guildId)
+                if not guild:
+                    continue
+
                 # Make sure the guild is configured with birthday role.
                 # If it's not, skip over it.
-                bdayRoleId = await self.config.guild(guild).get_attr(KEY_BDAY_ROLE)()
+                if guildId not in bdayRoleIds:
+                    bdayRoleIds[guildId] = await self.config.guild(guild).get_attr(KEY_BDAY_ROLE)()
+                bdayRoleId = bdayRoleIds[guildId]
                 if not bdayRoleId:
                     continue
 
-                # Check to see if any users need to be removed.
-                memberData = await self.config.all_members(guild)  # dict
-                for memberId, memberDetails in memberData.items():
-                    # If assigned and the date is different than the date assigned, remove role.
-                    if memberDetails[KEY_IS_ASSIGNED] and memberDetails[KEY_BDAY_DAY] != int(
-                        time.strftime("%d")
-                    ):
-                        role = discord.utils.get(guild.roles, id=bdayRoleId)
-                        member = discord.utils.get(guild.members, id=memberId)
-
-                        if member:
-                            # Remove the role
-                            try:
-                                await member.remove_roles(role)
-                                self.logger.info(
-                                    "Removed birthday role from %s#%s (%s)",
-                                    member.name,
-                                    member.discriminator,
-                                    member.id,
-                                )
-                            except discord.Forbidden:
-                                self.logger.error(
-                                    "Could not remove birthday role from %s#%s (%s)",
-                                    member.name,
-                                    member.discriminator,
-                                    member.id,
-                                    exc_info=True,
-                                )
-                        else:
-                            # Do not remove role, wait until user rejoins, in case
-                            # another cog saves roles.
-                            continue
-
-                        # Update the list.
-                        await self.config.member(member).get_attr(KEY_IS_ASSIGNED).set(False)
-
-    async def _dailyAdd(self):  # pylint: disable=too-many-branches
-        """Add guild members to the birthday role."""
-        guilds = self.bot.guilds
+                member = guild.get_member(memberId)
+                if not member:
+                    # Do not remove role, wait until user rejoins, in case
+                    # another cog saves roles.
+                    continue
+
+                role = guild.get_role(bdayRoleId)
+                if not role:
+                    continue
+
+                work.append((member, role))
+                self.pendingMembers.add((guildId, memberId))
+
+        if not work:
+            return
+
+        try:
+            results = await runBounded(
+                (partial(self._removeBirthdayRole, member, role) for member, role in work),
+                MAX_CONCURRENT_REQUESTS,
+            )
+
+            # Update the list.
+            async with membersLock:
+                for (member, _), unassigned in zip(work, results):
+                    if isinstance(unassigned, Exception):
+                        self.logger.error(
+                            "Could not remove birthday role from %s#%s (%s), will retry later",
+                            member.name,
+                            member.discriminator,
+                            member.id,
+                            exc_info=unassigned,
+                        )
+                        continue
+                    if not unassigned:
+                        continue
+                    await self.config.member(member).get_attr(KEY_IS_ASSIGNED).set(False)
+                    self.index.setAssigned(member.guild.id, member.id, False)
+        finally:
+            for member, _ in work:
+                self.pendingMembers.discard((member.guild.id, member.id))
+
+    async def _removeBirthdayRole(self, member: discord.Member, role: discord.Role) -> bool:
+        """Remove the birthday role from a member.
+
+        Returns
+        -------
+        bool
+            True if the member should be marked as unassigned, else False.
+        """
+        try:
+            await member.remove_roles(role)
+            self.logger.info(
+                "Removed birthday role from %s#%s (%s)",
+                member.name,
+                member.discriminator,
+                member.id,
+            )
+        except discord.Forbidden:
+            self.logger.error(
+                "Could not remove birthday role from %s#%s (%s)",
+                member.name,
+                member.discriminator,
+                member.id,
+                exc_info=True,
+            )
+        except discord.HTTPException:
+            # Try again on the next sweep.
+            self.logger.error(
+                "Could not remove birthday role from %s#%s (%s), will retry later",
+                member.name,
+                member.discriminator,
+                member.id,
+                exc_info=True,
+            )
+            return False
+        return True
+
+    async def _dailyAdd(self, guildIds: Optional[set] = None):  # pylint: disable=too-many-branches
+        """Add guild members to the birthday role.
+
+        The members to update are collected while holding the members lock, but the
+        role changes and announcements are made after releasing it, so that slow
+        requests do not block other commands.
+
+        Parameters
+        ----------
+        guildIds: Optional[set]
+            The IDs of the guilds to check. If not specified, all guilds are checked.
+        """
+        guildsData = {}
+        work = []  # (member, role, channel)
+        groupAnnouncements = {}  # channel -> [members]
+        # Guilds in different timezones may be on different dates.
+        timezones = set(self.timezones.values()) | {None}
+        todays = {datetime.now(gettz(tz) if tz else None).date() for tz in timezones}
 
         # Avoid having data modified by other methods.
         # When we acquire the lock for all members, it also prevents lock for guild
@@ -768,64 +1023,149 @@ class Birthday(commands.Cog):
         membersLock = self.config.get_members_lock()
 
         async with membersLock:
-            # Check each guild.
-            for guild in guilds:
+            # Only members whose birthday is today need to be checked.
+            candidates = set()
+            for today in todays:
+                candidates |= self.index.getMembers(today.month, today.day)
+
+            for guildId, memberId in candidates:
+                if guildIds is not None and guildId not in guildIds:
+                    continue
+                if (guildId, memberId) in self.pendingMembers:
+                    continue
+
+                # If today is the user's birthday, and the role is not assigned,
+                # assign the role.
+                today = self.getToday(guildId)
+                if self.index.getBirthday(guildId, memberId) != (today.month, today.day):
+                    continue
+                if self.index.isAssigned(guildId, memberId):
+                    continue
+
+                guild = self.bot.get_guild(guildId)
+                if not guild:
+                    continue
+
                 # Make sure the guild is configured with birthday role.
                 # If it's not, skip over it.
-                bdayRoleId = await self.config.guild(guild).get_attr(KEY_BDAY_ROLE)()
-                bdayChannelId = await self.config.guild(guild).get_attr(KEY_BDAY_CHANNEL)()
+                if guildId not in guildsData:
+                    guildsData[guildId] = await self.config.guild(guild).all()
+                bdayRoleId = guildsData[guildId][KEY_BDAY_ROLE]
+                bdayChannelId = guildsData[guildId][KEY_BDAY_CHANNEL]
                 if not bdayRoleId:
                     continue
 
-                memberData = await self.config.all_members(guild)  # dict
-                for memberId, memberDetails in memberData.items():
-                    # If today is the user's birthday, and the role is not assigned,
-                    # assign the role.
-
-                    # Check to see that birthdate day and month have been set.
-                    if (
-                        memberDetails[KEY_BDAY_DAY]
-                        and memberDetails[KEY_BDAY_MONTH]
-                        and memberDetails[KEY_BDAY_MONTH] == int(time.strftime("%m"))
-                        and memberDetails[KEY_BDAY_DAY] == int(time.strftime("%d"))
-                    ):
-                        # Get the necessary Discord objects.
-                        role = discord.utils.get(guild.roles, id=bdayRoleId)
-                        member = discord.utils.get(guild.members, id=memberId)
-                        channel = discord.utils.get(guild.channels, id=bdayChannelId)
-
-                        # Skip if member is no longer in server.
-                        if not member:
-                            continue
-
-                        if not memberDetails[KEY_IS_ASSIGNED]:
-                            try:
-                                await member.add_roles(role)
-                                self.logger.info(
-                                    "Added birthday role to %s#%s (%s)",
-                                    member.name,
-                                    member.discriminator,
-                                    member.id,
-                                )
-                                # Update the list.
-                                await self.config.member(member).get_attr(KEY_IS_ASSIGNED).set(
-                                    True
-                                )
-
-                            except discord.Forbidden:
-                                self.logger.error(
-                                    "Could not add role to %s#%s (%s)",
-                                    member.name,
-                                    member.discriminator,
-                                    member.id,
-                                    exc_info=True,
-                                )
-                            if not channel:
-                                continue
-                            try:
-                                msg = self.getBirthdayMessage(member)
-                                await channel.send(msg)
-                            except discord.Forbidden:
-                                self.logger.error(
-                                    "Could not send message!", exc_info=True,
-                                )
+                # Get the necessary Discord objects.
+                member = guild.get_member(memberId)
+                channel = guild.get_channel(bdayChannelId) if bdayChannelId else None
+
+                # Skip if member is no longer in server.
+                if not member:
+                    continue
+
+                role = guild.get_role(bdayRoleId)
+                if not role:
+                    continue
+
+                # Only announce members whose role will be added.
+                if channel and guildsData[guildId][KEY_GROUP_ANNOUNCE]:
+                    groupAnnouncements.setdefault(channel, []).append(member)
+                    channel = None
+                work.append((member, role, channel))
+                self.pendingMembers.add((guildId, memberId))
+
+        if not work and not groupAnnouncements:
+            return
+
+        try:
+            results = await runBounded(
+                (partial(self._addBirthdayRole, *job) for job in work),
+                MAX_CONCURRENT_REQUESTS,
+            )
+            announceResults = await runBounded(
+                (
+                    partial(self._sendGroupAnnouncement, channel, members)
+                    for channel, members in groupAnnouncements.items()
+                ),
+                MAX_CONCURRENT_REQUESTS,
+            )
+            for error in announceResults:
+                if isinstance(error, Exception):
+                    self.logger.error("Could not send group announcement!", exc_info=error)
+
+            # Update the list.
+            async with membersLock:
+                for (member, _, _), assigned in zip(work, results):
+                    if isinstance(assigned, Exception):
+                        self.logger.error(
+                            "Could not add role to %s#%s (%s)",
+                            member.name,
+                            member.discriminator,
+                            member.id,
+                            exc_info=assigned,
+                        )
+                        continue
+                    if not assigned:
+                        continue
+                    await self.config.member(member).get_attr(KEY_IS_ASSIGNED).set(True)
+                    self.index.setAssigned(member.guild.id, member.id, True)
+        finally:
+            for member, _, _ in work:
+                self.pendingMembers.discard((member.guild.id, member.id))
+
+    async def _addBirthdayRole(
+        self,
+        member: discord.Member,
+        role: discord.Role,
+        channel: Optional[discord.TextChannel],
+    ) -> bool:
+        """Add the birthday role to a member, and announce their birthday.
+
+        Returns
+        -------
+        bool
+            True if the role was added, else False.
+        """
+        assigned = False
+        try:
+            await member.add_roles(role)
+            self.logger.info(
+                "Added birthday role to %s#%s (%s)",
+                member.name,
+                member.discriminator,
+                member.id,
+            )
+            assigned = True
+        except discord.HTTPException:
+            self.logger.error(
+                "Could not add role to %s#%s (%s)",
+                member.name,
+                member.discriminator,
+                member.id,
+                exc_info=True,
+            )
+
+        if channel:
+            try:
+                msg = self.getBirthdayMessage(member)
+                await channel.send(msg)
+            except discord.HTTPException:
+                self.logger.error(
+                    "Could not send message!",
+                    exc_info=True,
+                )
+        return assigned
+
+    async def _sendGroupAnnouncement(
+        self, channel: discord.TextChannel, members: List[discord.Member]
+    ):
+        """Announce the birthdays of several members in as few messages as possible."""
+        for msg in self.getGroupBirthdayMessages(members):
+            try:
+                await channel.send(msg)
+            except discord.HTTPException:
+                self.logger.error(
+                    "Could not send message!",
+                    exc_info=True,
+                )
+                return
@@ -6,6 +6,8 @@ KEY_BDAY_MONTH = "birthdateMonth"
 KEY_BDAY_DAY = "birthdateDay"
 KEY_IS_ASSIGNED = "isAssigned"
 KEY_ALLOW_SELF_BDAY = "allowSelfBirthday"
+KEY_TIMEZONE = "timezone"
+KEY_GROUP_ANNOUNCE = "groupAnnouncement"
 
 BASE_GUILD_MEMBER = {
     KEY_ADDED_BEFORE: False,
@@ -18,8 +20,14 @@ BASE_GUILD = {
     KEY_BDAY_CHANNEL: None,
     KEY_BDAY_ROLE: None,
     KEY_ALLOW_SELF_BDAY: False,
+    KEY_TIMEZONE: None,
+    KEY_GROUP_ANNOUNCE: False,
 }
 
+MAX_CONCURRENT_REQUESTS = 5  # Max number of role changes/messages in flight at once
+
+MAX_MSG_LEN = 2000
+
 BOT_BIRTHDAY_MSG = "Wow! It's my own birthday! Happy birthday to myself!"
 CANNED_MESSAGES = [
     "Wow look, it's {}'s birthday today! Happy birthday, hope you have a good one!",
@@ -28,3 +36,6 @@ CANNED_MESSAGES = [
     "Hey everyone! It's {} birthday, come and wish them a happy birthday!",
     "Wow {}, happy birthday! How does it feel to be more boomer than you were yesterday?",
 ]
+GROUP_BIRTHDAY_MSG = (
+    "Wow look, it's the birthday of {} today! Happy birthday, hope you all have a good one!"
+)
@@ -0,0 +1,125 @@
+import asyncio
+from collections import defaultdict
+from typing import (
+    Awaitable,
+    Callable,
+    DefaultDict,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .constants import KEY_BDAY_DAY, KEY_BDAY_MONTH, KEY_IS_ASSIGNED
+
+T = TypeVar("T")
+
+# (guild ID, member ID)
+MemberKey = Tuple[int, int]
+# (month, day)
+MonthDay = Tuple[int, int]
+
+
+class BirthdayIndex:
+    """An in-memory index of member birthdays, by month and day.
+
+    This mirrors the member config, so that the daily job only has to look at the
+    members whose birthday is today, or who currently have the birthday role.
+    """
+
+    def __init__(self):
+        self._dates: DefaultDict[MonthDay, Set[MemberKey]] = defaultdict(set)
+        self._birthdays: Dict[MemberKey, MonthDay] = {}
+        self._assigned: Set[MemberKey] = set()
+
+    def rebuild(self, allMembers: Dict[int, Dict[int, dict]]):
+        """Rebuild the index from member config.
+
+        Parameters
+        ----------
+        allMembers: Dict[int, Dict[int, dict]]
+            Member data of all guilds, as returned by `Config.all_members()`.
+        """
+        self._dates.clear()
+        self._birthdays.clear()
+        self._assigned.clear()
+        for guildId, members in allMembers.items():
+            for memberId, memberDetails in members.items():
+                month = memberDetails.get(KEY_BDAY_MONTH)
+                day = memberDetails.get(KEY_BDAY_DAY)
+                if month and day:
+                    self.set(guildId, memberId, month, day)
+                if memberDetails.get(KEY_IS_ASSIGNED):
+                    self.setAssigned(guildId, memberId, True)
+
+    def set(self, guildId: int, memberId: int, month: int, day: int):
+        """Set the birthday of a guild member."""
+        self.remove(guildId, memberId)
+        self._birthdays[(guildId, memberId)] = (month, day)
+        self._dates[(month, day)].add((guildId, memberId))
+
+    def remove(self, guildId: int, memberId: int):
+        """Remove the birthday of a guild member, if it is set."""
+        monthDay = self._birthdays.pop((guildId, memberId), None)
+        if monthDay is None:
+            return
+        members = self._dates[monthDay]
+        members.discard((guildId, memberId))
+        if not members:
+            del self._dates[monthDay]
+
+    def getBirthday(self, guildId: int, memberId: int) -> Optional[MonthDay]:
+        """Get the (month, day) birthday of a guild member, or None if it is not set."""
+        return self._birthdays.get((guildId, memberId))
+
+    def getMembers(self, month: int, day: int) -> FrozenSet[MemberKey]:
+        """Get the (guild ID, member ID) of all members with a birthday on this day."""
+        return frozenset(self._dates.get((month, day), ()))
+
+    def setAssigned(self, guildId: int, memberId: int, assigned: bool):
+        """Set whether a guild member currently has the birthday role."""
+        if assigned:
+            self._assigned.add((guildId, memberId))
+        else:
+            self._assigned.discard((guildId, memberId))
+
+    def isAssigned(self, guildId: int, memberId: int) -> bool:
+        """Check whether a guild member currently has the birthday role."""
+        return (guildId, memberId) in self._assigned
+
+    def getAssigned(self) -> FrozenSet[MemberKey]:
+        """Get the (guild ID, member ID) of all members that have the birthday role."""
+        return frozenset(self._assigned)
+
+
+async def runBounded(
+    jobs: Iterable[Callable[[], Awaitable[T]]], limit: int
+) -> List[Union[T, Exception]]:
+    """Run jobs concurrently, with at most `limit` of them running at once.
+
+    A job that raises does not stop the others, its exception is returned instead.
+
+    Parameters
+    ----------
+    jobs: Iterable[Callable[[], Awaitable[T]]]
+        Functions that return the awaitable to run for each job.
+    limit: int
+        The maximum number of jobs running at once.
+
+    Returns
+    -------
+    List[Union[T, Exception]]
+        The results or exceptions of the jobs, in the same order as the jobs.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(job: Callable[[], Awaitable[T]]) -> T:
+        async with semaphore:
+            return await job()
+
+    return await asyncio.gather(*(run(job) for job in jobs), return_exceptions=True)
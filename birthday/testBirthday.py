@@ -4,7 +4,7 @@ import pytest
 
 
 from .birthday import Birthday
-from .constants import BOT_BIRTHDAY_MSG, CANNED_MESSAGES
+from .constants import BOT_BIRTHDAY_MSG, CANNED_MESSAGES, GROUP_BIRTHDAY_MSG, MAX_MSG_LEN
 
 
 class MockUser:
@@ -52,3 +52,41 @@ class TestBirthdayHelpers:
 
         msg = birthday.getBirthdayMessage(mockUser)
         assert msg == BOT_BIRTHDAY_MSG
+
+    def testGetGroupBirthdayMessagesWithOneMember(self, mocker):
+        # Do not initialize config, logger, and background task
+        mocker.patch("birthday.Birthday.initializeConfigAndLogger")
+        mocker.patch("birthday.Birthday.initializeBgTask")
+
+        birthday = Birthday(self.bot)
+        mockUser = MockUser(1111, "Onii-chan")
+        expectedMessages = [msg.format(mockUser.mention) for msg in CANNED_MESSAGES]
+
+        msgs = birthday.getGroupBirthdayMessages([mockUser])
+        assert len(msgs) == 1
+        assert msgs[0] in expectedMessages
+
+    def testGetGroupBirthdayMessagesWithManyMembers(self, mocker):
+        # Do not initialize config, logger, and background task
+        mocker.patch("birthday.Birthday.initializeConfigAndLogger")
+        mocker.patch("birthday.Birthday.initializeBgTask")
+
+        birthday = Birthday(self.bot)
+        mockUsers = [MockUser(uid, f"<@{uid}>") for uid in range(3)]
+
+        msgs = birthday.getGroupBirthdayMessages(mockUsers)
+        assert msgs == [GROUP_BIRTHDAY_MSG.format("<@0>, <@1>, <@2>")]
+
+    def testGetGroupBirthdayMessagesIsPaginated(self, mocker):
+        # Do not initialize config, logger, and background task
+        mocker.patch("birthday.Birthday.initializeConfigAndLogger")
+        mocker.patch("birthday.Birthday.initializeBgTask")
+
+        birthday = Birthday(self.bot)
+        mockUsers = [MockUser(uid, f"<@{uid}>") for uid in range(10**17, 10**17 + 200)]
+
+        msgs = birthday.getGroupBirthdayMessages(mockUsers)
+        assert len(msgs) > 1
+        assert all(len(msg) <= MAX_MSG_LEN for msg in msgs)
+        for mockUser in mockUsers:
+            assert sum(mockUser.mention in msg for msg in msgs) == 1
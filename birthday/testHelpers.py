@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from .constants import BASE_GUILD_MEMBER, KEY_BDAY_DAY, KEY_BDAY_MONTH, KEY_IS_ASSIGNED
+from .helpers import BirthdayIndex, runBounded
+
+
+class TestBirthdayIndex:
+    """Tests to ensure BirthdayIndex mirrors member birthdays as expected."""
+
+    def testRebuild(self):
+        index = BirthdayIndex()
+        index.rebuild(
+            {
+                1: {
+                    10: {**BASE_GUILD_MEMBER, KEY_BDAY_MONTH: 2, KEY_BDAY_DAY: 29},
+                    11: {**BASE_GUILD_MEMBER, KEY_BDAY_MONTH: 12, KEY_BDAY_DAY: 25},
+                    12: {**BASE_GUILD_MEMBER},
+                },
+                2: {
+                    10: {
+                        **BASE_GUILD_MEMBER,
+                        KEY_BDAY_MONTH: 2,
+                        KEY_BDAY_DAY: 29,
+                        KEY_IS_ASSIGNED: True,
+                    },
+                },
+            }
+        )
+
+        assert index.getMembers(2, 29) == {(1, 10), (2, 10)}
+        assert index.getMembers(12, 25) == {(1, 11)}
+        assert index.getMembers(1, 1) == set()
+        assert index.getBirthday(1, 12) is None
+        assert index.getAssigned() == {(2, 10)}
+        assert index.isAssigned(2, 10)
+        assert not index.isAssigned(1, 10)
+
+    def testSetAndRemove(self):
+        index = BirthdayIndex()
+        index.set(1, 10, 2, 29)
+        assert index.getBirthday(1, 10) == (2, 29)
+
+        # Updating a birthday moves the member to the new date.
+        index.set(1, 10, 3, 1)
+        assert index.getBirthday(1, 10) == (3, 1)
+        assert index.getMembers(2, 29) == set()
+        assert index.getMembers(3, 1) == {(1, 10)}
+
+        index.remove(1, 10)
+        assert index.getBirthday(1, 10) is None
+        assert index.getMembers(3, 1) == set()
+
+        # Removing a member without a birthday is a no-op.
+        index.remove(1, 10)
+
+    def testSetAssigned(self):
+        index = BirthdayIndex()
+        index.setAssigned(1, 10, True)
+        assert index.getAssigned() == {(1, 10)}
+        index.setAssigned(1, 10, False)
+        index.setAssigned(1, 11, False)
+        assert index.getAssigned() == set()
+
+
+@pytest.mark.asyncio
+class TestRunBounded:
+    """Tests to ensure helper runBounded() works as expected."""
+
+    async def testLimitAndOrder(self):
+        running = 0
+        maxRunning = 0
+
+        async def job(value):
+            nonlocal running, maxRunning
+            running += 1
+            maxRunning = max(maxRunning, running)
+            await asyncio.sleep(0)
+            running -= 1
+            return value
+
+        results = await runBounded((lambda v=v: job(v) for v in range(10)), limit=3)
+        assert results == list(range(10))
+        assert maxRunning == 3
+
+    async def testExceptionsDoNotStopOtherJobs(self):
+        error = ValueError("bad role")
+
+        async def job(value):
+            if value == 1:
+                raise error
+            await asyncio.sleep(0)
+            return value
+
+        results = await runBounded((lambda v=v: job(v) for v in range(3)), limit=3)
+        assert results == [0, error, 2]
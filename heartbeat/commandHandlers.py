@@ -15,6 +15,15 @@ class CommandHandlers(CommandsCore):
     async def _grpHbSettings(self, ctx: Context):
         """Configure heartbeat settings."""
 
+    @_grpHbSettings.command(name="lag")
+    async def _cmdLag(self, ctx: Context):
+        """Show the event loop lag over the last hour.
+
+        This includes the lag percentiles, and the code that held up the event loop
+        the longest.
+        """
+        await self.cmdLag(ctx=ctx)
+
     @_grpHbSettings.command(name="url")
     async def _cmdUrl(self, ctx: Context, url: str):
         """Set the push URL to notify
@@ -26,6 +35,30 @@ class CommandHandlers(CommandsCore):
         """
         await self.cmdUrl(ctx=ctx, url=url)
 
+    @_grpHbSettings.command(name="addurl")
+    async def _cmdAddUrl(self, ctx: Context, url: str):
+        """Add another push URL to notify.
+
+        All push URLs are notified at the same time.
+
+        Parameters:
+        -----------
+        url: str
+            The URL to notify.
+        """
+        await self.cmdAddUrl(ctx=ctx, url=url)
+
+    @_grpHbSettings.command(name="removeurl")
+    async def _cmdRemoveUrl(self, ctx: Context, url: str):
+        """Remove a push URL.
+
+        Parameters:
+        -----------
+        url: str
+            The URL to stop notifying.
+        """
+        await self.cmdRemoveUrl(ctx=ctx, url=url)
+
     @_grpHbSettings.command(name="interval")
     async def _cmdInterval(self, ctx: Context, interval: int):
         """Set the heartbeat interval.
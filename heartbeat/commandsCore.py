@@ -1,7 +1,19 @@
+import math
+from time import monotonic
+
 from redbot.core.commands.context import Context
+from redbot.core.utils.chat_formatting import box, humanize_number
 
 from .core import Core
-from .constants import KEY_INSTANCE_NAME, KEY_INTERVAL, KEY_PUSH_URL, MIN_INTERVAL
+from .constants import (
+    KEY_INSTANCE_NAME,
+    KEY_INTERVAL,
+    KEY_PUSH_URL,
+    KEY_PUSH_URLS,
+    LAG_BUCKETS,
+    LAG_HISTORY,
+    MIN_INTERVAL,
+)
 
 
 class CommandsCore(Core):
@@ -9,6 +21,32 @@ class CommandsCore(Core):
         name = await self.config.get_attr(KEY_INSTANCE_NAME)()
         await ctx.send(f"**{name}** is responding.")
 
+    @staticmethod
+    def formatLagBucket(lag: float) -> str:
+        """Format the upper bound of a lag histogram bucket."""
+        if math.isinf(lag):
+            return f"over {LAG_BUCKETS[-2] * 1000:g} ms"
+        return f"{lag * 1000:g} ms or less"
+
+    async def cmdLag(self, ctx: Context):
+        """Show the event loop lag over the last hour."""
+        monitor = self.lagMonitor
+        monitor.prune(monotonic())
+        lines = [
+            f"Event loop lag over the last {LAG_HISTORY // 60} minutes "
+            f"({humanize_number(monitor.sampleCount())} samples):",
+            f"p50: {self.formatLagBucket(monitor.percentile(50))}",
+            f"p99: {self.formatLagBucket(monitor.percentile(99))}",
+            f"max: {monitor.maxLag() * 1000:.0f} ms",
+        ]
+        slowCallbacks = monitor.topSlowCallbacks(5)
+        if slowCallbacks:
+            lines.append("")
+            lines.append("Slowest code:")
+            for location, count, totalLag in slowCallbacks:
+                lines.append(f"{totalLag:.2f} s total, {count} times: {location}")
+        await ctx.send(box("\n".join(lines)))
+
     async def cmdUrl(self, ctx: Context, url: str):
         """Set the push URL to notify
 
@@ -18,8 +56,50 @@ class CommandsCore(Core):
             The URL to notify.
         """
         await self.config.get_attr(KEY_PUSH_URL).set(url)
+        await self.loadSettings()
         await ctx.send(f"Set the push URL to: `{url}`")
 
+    async def cmdAddUrl(self, ctx: Context, url: str):
+        """Add another push URL to notify.
+
+        All push URLs are notified at the same time.
+
+        Parameters:
+        -----------
+        url: str
+            The URL to notify.
+        """
+        async with self.config.get_attr(KEY_PUSH_URLS)() as pushUrls:
+            if url in pushUrls:
+                await ctx.send(f"`{url}` is already a push URL.")
+                return
+            pushUrls.append(url)
+        await self.loadSettings()
+        await ctx.send(f"Added push URL: `{url}`")
+
+    async def cmdRemoveUrl(self, ctx: Context, url: str):
+        """Remove a push URL.
+
+        Parameters:
+        -----------
+        url: str
+            The URL to stop notifying.
+        """
+        removed = False
+        async with self.config.get_attr(KEY_PUSH_URLS)() as pushUrls:
+            if url in pushUrls:
+                pushUrls.remove(url)
+                removed = True
+        if url == await self.config.get_attr(KEY_PUSH_URL)():
+            await self.config.get_attr(KEY_PUSH_URL).clear()
+            removed = True
+        if not removed:
+            await ctx.send(f"`{url}` is not a push URL.")
+            return
+        self.backoff.pop(url, None)
+        await self.loadSettings()
+        await ctx.send(f"Removed push URL: `{url}`")
+
     async def cmdInterval(self, ctx: Context, interval: int):
         """Set the heartbeat interval.
 
@@ -32,6 +112,7 @@ class CommandsCore(Core):
             await ctx.send(f"Please set an interval greater than **{MIN_INTERVAL}** seconds")
             return
         await self.config.get_attr(KEY_INTERVAL).set(interval)
+        self.interval = interval
         await ctx.send(f"Set interval to: `{interval}` seconds")
 
     async def cmdName(self, ctx: Context, name: str):
@@ -32,12 +32,14 @@ async def cogHeartbeat(
             # task needs to be tested, then method _loop
             # can be examined accordingly.
             patchContext.setattr(target=Core, name="_loop", value=unittest.mock.AsyncMock())
+            patchContext.setattr(target=Core, name="_lagLoop", value=unittest.mock.AsyncMock())
             await red.add_cog(Heartbeat(bot=red))
 
         cog = red.get_cog(Heartbeat.__name__)
         assert isinstance(cog, Heartbeat)
 
         cog.bgTask.cancel()
+        cog.lagTask.cancel()
 
         yield cog
 
@@ -4,10 +4,28 @@ import logging
 KEY_INSTANCE_NAME = "instanceName"
 KEY_INTERVAL = "interval"
 KEY_PUSH_URL = "pushUrl"
+KEY_PUSH_URLS = "pushUrls"
 
 LOGGER = logging.getLogger("red.luicogs.Heartbeat")
 
 MIN_INTERVAL = 10
-MAX_FAILED_PINGS = 15
+MAX_BACKOFF = 60 * 60  # Longest time to wait before pinging a failing push URL again, in seconds
+BACKOFF_JITTER = 0.2  # Backoff delays are randomly scaled by up to this fraction
+MAX_CONNECTIONS = 10  # Max number of simultaneous connections to push URLs
+PING_TIMEOUT = 30  # Time to wait for a push URL to respond, in seconds
 
-DEFAULT_GLOBAL = {KEY_INSTANCE_NAME: "Ren", KEY_INTERVAL: 295, KEY_PUSH_URL: None}
+# Event loop lag monitor, times are in seconds
+LAG_SAMPLE_INTERVAL = 0.5  # How often to measure the lag
+LAG_HISTORY = 60 * 60  # How long to keep lag samples for
+# Upper bounds of the lag histogram buckets
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+SLOW_CALLBACK_THRESHOLD = 0.25  # Lag above this is blamed on a slow callback
+LAG_WARN_THRESHOLD = 1  # Pings are marked with a lag warning above this lag
+LAG_WITHHOLD_THRESHOLD = 10  # Pings are not sent above this lag
+
+DEFAULT_GLOBAL = {
+    KEY_INSTANCE_NAME: "Ren",
+    KEY_INTERVAL: 295,
+    KEY_PUSH_URL: None,
+    KEY_PUSH_URLS: [],
+}
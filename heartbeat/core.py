@@ -1,10 +1,16 @@
 import aiohttp
 import asyncio  # Used for task loop.
+import math
+import random
+from time import monotonic
+from typing import Dict, List, Optional, Tuple
 
 from redbot.core import Config
 from redbot.core.bot import Red
+from yarl import URL
 
 from .constants import *
+from .lagMonitor import LagMonitor
 
 
 class Core:
@@ -12,32 +18,123 @@ class Core:
         self.bot = bot
         self.config = Config.get_conf(self, identifier=5842647, force_registration=True)
         self.config.register_global(**DEFAULT_GLOBAL)
+        # Settings used by the loop, loaded from config when the loop starts,
+        # and kept up to date by the settings commands.
+        self.interval: Optional[int] = None
+        self.pushUrls: List[str] = []
+        # Push URL -> (failed pings in a row, monotonic time to ping again)
+        self.backoff: Dict[str, Tuple[int, float]] = {}
+        self.lagMonitor = LagMonitor()
         self.bgTask = self.bot.loop.create_task(self._loop())
+        self.lagTask = self.bot.loop.create_task(self._lagLoop())
+
+    async def loadSettings(self):
+        """Load the interval and push URLs from config."""
+        self.interval = await self.config.get_attr(KEY_INTERVAL)()
+        pushUrl: Optional[str] = await self.config.get_attr(KEY_PUSH_URL)()
+        pushUrls: List[str] = await self.config.get_attr(KEY_PUSH_URLS)()
+        # keep the order, without duplicates
+        self.pushUrls = list(dict.fromkeys(url for url in (pushUrl, *pushUrls) if url))
+
+    def getHealthMetrics(self, loopLag: float) -> Dict[str, str]:
+        """Get the bot health metrics sent along with each ping.
+
+        Parameters:
+        -----------
+        loopLag: float
+            The recent event loop lag, in seconds.
+
+        Returns:
+        --------
+        Dict[str, str]
+            The query parameters to add to the push URLs.
+        """
+        metrics = {
+            "lag": f"{loopLag * 1000:.0f}",
+            "guilds": str(len(self.bot.guilds)),
+        }
+        if loopLag > LAG_WARN_THRESHOLD:
+            metrics["lagWarning"] = "1"
+        latency = self.bot.latency
+        # the latency is not a number until the first gateway heartbeat
+        if math.isfinite(latency):
+            metrics["latency"] = f"{latency * 1000:.0f}"
+        return metrics
+
+    def recordPing(self, url: str, ok: bool, now: float):
+        """Record the result of a ping, and back off from push URLs that keep failing.
+
+        The delay before the next ping doubles after every failed ping in a row, up to
+        `MAX_BACKOFF` seconds, and is randomly scaled by up to `BACKOFF_JITTER`.
+        """
+        if ok:
+            if self.backoff.pop(url, None):
+                LOGGER.info("Successfully pinged %s again", url)
+            return
+
+        failures = self.backoff.get(url, (0, now))[0] + 1
+        delay = min(self.interval * 2 ** (failures - 1), MAX_BACKOFF)
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        self.backoff[url] = (failures, now + delay)
+        LOGGER.debug("Retrying %s in %d seconds... (failed %d times)", url, delay, failures)
+
+    async def ping(self, session: aiohttp.ClientSession, url: str, metrics: Dict[str, str]):
+        """Ping a push URL with the bot health metrics.
+
+        Returns:
+        --------
+        bool
+            Whether the ping succeeded.
+        """
+        LOGGER.debug("Pinging %s", url)
+        try:
+            async with session.get(URL(url).update_query(metrics)) as resp:
+                if resp.status == 200:
+                    LOGGER.debug("Successfully pinged %s", url)
+                    return True
+                LOGGER.error("HTTP GET failed! We got HTTP code %s", resp.status)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            LOGGER.error("Something went wrong pinging %s!", url, exc_info=True)
+        return False
 
     async def _loop(self):
-        session = aiohttp.ClientSession()
-        initialInterval = await self.config.get_attr(KEY_INTERVAL)()
-        LOGGER.info("Heartbeat is running, pinging at %s second intervals", initialInterval)
-
-        countFailedPings = 0
-        # the following loop shall break only on cancel event
-        # and shall keep running on other exceptions until exceeding
-        # the threshold for failed retries
+        await self.loadSettings()
+        LOGGER.info("Heartbeat is running, pinging at %s second intervals", self.interval)
+
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS),
+            timeout=aiohttp.ClientTimeout(total=PING_TIMEOUT),
+        )
+        # the following loop shall break only on cancel event,
+        # and shall keep running on other exceptions
         while self == self.bot.get_cog("Heartbeat"):
             try:
-                await asyncio.sleep(await self.config.get_attr(KEY_INTERVAL)())
-                url = await self.config.get_attr(KEY_PUSH_URL)()
-                if url:
-                    LOGGER.debug("Pinging %s", url)
-                    async with session.get(url) as resp:
-                        if resp.status == 200:
-                            # reset failed count to zero on success
-                            LOGGER.debug("Successfully pinged %s", url)
-                            countFailedPings = 0
-                        else:
-                            # increment failed count
-                            LOGGER.error("HTTP GET failed! We got HTTP code %s", resp.status)
-                            countFailedPings += 1
+                await asyncio.sleep(self.interval)
+                now = monotonic()
+
+                dueUrls = [
+                    url
+                    for url in self.pushUrls
+                    if url not in self.backoff or self.backoff[url][1] <= now
+                ]
+                if not dueUrls:
+                    continue
+
+                # the current and previous minute, so there are always enough samples
+                loopLag = self.lagMonitor.maxLag(minutes=2)
+                if loopLag > LAG_WITHHOLD_THRESHOLD:
+                    # let the uptime monitor notice that the bot is not responsive
+                    LOGGER.warning("Event loop lag is %.1f seconds, not pinging", loopLag)
+                    continue
+
+                metrics = self.getHealthMetrics(loopLag)
+                results = await asyncio.gather(
+                    *(self.ping(session, url, metrics) for url in dueUrls)
+                )
+                for url, ok in zip(dueUrls, results):
+                    self.recordPing(url, ok, now)
             except asyncio.CancelledError:
                 # cancelled
                 LOGGER.error(
@@ -47,37 +144,30 @@ class Core:
                 )
                 break
             except Exception:
-                # keep retrying
+                # keep going
                 LOGGER.error("Something went wrong!", exc_info=True)
-                countFailedPings += 1
             except:
                 # these abnormal exceptions should not happen
                 LOGGER.error("Something went horribly wrong!", exc_info=True)
                 break
 
-            if countFailedPings > 0:
-                if countFailedPings <= MAX_FAILED_PINGS:
-                    LOGGER.debug(
-                        "Retrying in %d seconds... (attempt %d of %d)",
-                        await self.config.get_attr(KEY_INTERVAL)(),
-                        countFailedPings,
-                        MAX_FAILED_PINGS,
-                    )
-                else:
-                    LOGGER.error(
-                        "Heartbeat main loop stopped after exceeding %d failed attempts",
-                        MAX_FAILED_PINGS,
-                    )
-                    break
-
         # the session has to be closed
         if not session.closed:
             await session.close()
 
+    async def _lagLoop(self):
+        try:
+            await self.lagMonitor.run()
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            LOGGER.error("The lag monitor stopped!", exc_info=True)
+
     # Cancel the background task on cog unload.
     def __unload(self):  # pylint: disable=invalid-name
         LOGGER.info("Cancelling heartbeat")
         self.bgTask.cancel()
+        self.lagTask.cancel()
 
     def cog_unload(self):
         self.__unload()
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import sys
+import threading
+from bisect import bisect_left
+from collections import Counter, deque
+from time import monotonic
+from typing import Deque, List, Optional, Tuple
+
+from .constants import (
+    LAG_BUCKETS,
+    LAG_HISTORY,
+    LAG_SAMPLE_INTERVAL,
+    LOGGER,
+    SLOW_CALLBACK_THRESHOLD,
+)
+
+
+class LagHistogram:
+    """Lag samples of one minute."""
+
+    def __init__(self, minute: int):
+        self.minute = minute
+        # sample count per bucket in `LAG_BUCKETS`
+        self.counts: List[int] = [0] * len(LAG_BUCKETS)
+        self.maxLag: float = 0.0
+
+
+class LagMonitor:
+    """Measures how late the event loop runs scheduled callbacks.
+
+    A sampler task sleeps for `LAG_SAMPLE_INTERVAL` seconds at a time, and records how
+    much later than that it woke up. Samples are counted in a histogram per minute,
+    for the last `LAG_HISTORY` seconds.
+
+    A watchdog thread notices when the event loop has been stuck for more than
+    `SLOW_CALLBACK_THRESHOLD` seconds, and records where in the code it is stuck.
+    """
+
+    def __init__(self):
+        # oldest first
+        self.histograms: Deque[LagHistogram] = deque()
+        # (time, code location, lag in seconds) of each slow callback, oldest first
+        self.slowCallbacks: Deque[Tuple[float, str, float]] = deque()
+        # when the sampler last woke up
+        self.lastTick: float = monotonic()
+        # (`lastTick` of the stall, code location) of where the event loop was last stuck
+        self.stall: Optional[Tuple[float, Optional[str]]] = None
+        self.loopThreadId: Optional[int] = None
+
+    def record(self, lag: float, now: float):
+        """Record a lag sample.
+
+        Parameters:
+        -----------
+        lag: float
+            How late the sampler woke up, in seconds.
+        now: float
+            The monotonic time of the sample.
+        """
+        minute = int(now // 60)
+        if not self.histograms or self.histograms[-1].minute != minute:
+            self.histograms.append(LagHistogram(minute))
+        histogram = self.histograms[-1]
+        histogram.counts[min(bisect_left(LAG_BUCKETS, lag), len(LAG_BUCKETS) - 1)] += 1
+        histogram.maxLag = max(histogram.maxLag, lag)
+
+        if lag > SLOW_CALLBACK_THRESHOLD:
+            location = None
+            if self.stall and self.stall[0] == self.lastTick:
+                location = self.stall[1]
+            self.slowCallbacks.append((now, location or "unknown", lag))
+
+        self.prune(now)
+
+    def prune(self, now: float):
+        """Forget samples older than `LAG_HISTORY` seconds."""
+        oldestMinute = int((now - LAG_HISTORY) // 60)
+        while self.histograms and self.histograms[0].minute <= oldestMinute:
+            self.histograms.popleft()
+        while self.slowCallbacks and self.slowCallbacks[0][0] < now - LAG_HISTORY:
+            self.slowCallbacks.popleft()
+
+    def sampleCount(self) -> int:
+        """Get the number of lag samples kept."""
+        return sum(sum(histogram.counts) for histogram in self.histograms)
+
+    def maxLag(self, minutes: Optional[int] = None) -> float:
+        """Get the highest lag, in seconds.
+
+        Parameters:
+        -----------
+        minutes: Optional[int]
+            Only use samples from this many of the most recent minutes.
+        """
+        histograms = list(self.histograms)
+        if minutes is not None:
+            histograms = histograms[-minutes:]
+        return max((histogram.maxLag for histogram in histograms), default=0.0)
+
+    def percentile(self, percent: float, minutes: Optional[int] = None) -> float:
+        """Get a lag percentile, rounded up to the upper bound of its histogram bucket.
+
+        Parameters:
+        -----------
+        percent: float
+            The percentile to get, between 0 and 100.
+        minutes: Optional[int]
+            Only use samples from this many of the most recent minutes.
+
+        Returns:
+        --------
+        float
+            The lag in seconds, or 0 if there are no samples.
+        """
+        histograms = list(self.histograms)
+        if minutes is not None:
+            histograms = histograms[-minutes:]
+        totals = [sum(counts) for counts in zip(*(histogram.counts for histogram in histograms))]
+        numSamples = sum(totals)
+        if not numSamples:
+            return 0.0
+        rank = percent / 100 * numSamples
+        seen = 0
+        for bucket, count in enumerate(totals):
+            seen += count
+            if count and seen >= rank:
+                return LAG_BUCKETS[bucket]
+        return LAG_BUCKETS[-1]
+
+    def topSlowCallbacks(self, count: int) -> List[Tuple[str, int, float]]:
+        """Get the code locations that held up the event loop for the longest.
+
+        Returns:
+        --------
+        List[Tuple[str, int, float]]
+            The code location, the number of times it was seen, and the total lag in
+            seconds, for the `count` locations with the most total lag.
+        """
+        totals: Counter = Counter()
+        times: Counter = Counter()
+        for _, location, lag in self.slowCallbacks:
+            totals[location] += lag
+            times[location] += 1
+        return [
+            (location, times[location], total) for location, total in totals.most_common(count)
+        ]
+
+    def getLoopLocation(self) -> Optional[str]:
+        """Get where in the code the event loop thread is running right now."""
+        frame = sys._current_frames().get(self.loopThreadId)  # pylint: disable=protected-access
+        asyncioDir = os.path.dirname(asyncio.__file__)
+        # the innermost frame outside of asyncio itself
+        while frame and frame.f_code.co_filename.startswith(asyncioDir):
+            frame = frame.f_back
+        if not frame:
+            return None
+        fileName = os.path.join(*frame.f_code.co_filename.split(os.sep)[-2:])
+        return f"{frame.f_code.co_name} ({fileName}:{frame.f_lineno})"
+
+    def watchdog(self, stopEvent: threading.Event):
+        """Record where the event loop is stuck, from a separate thread."""
+        while not stopEvent.wait(LAG_SAMPLE_INTERVAL):
+            lastTick = self.lastTick
+            stalled = monotonic() - lastTick - LAG_SAMPLE_INTERVAL
+            if stalled > SLOW_CALLBACK_THRESHOLD and (not self.stall or self.stall[0] != lastTick):
+                self.stall = (lastTick, self.getLoopLocation())
+
+    async def run(self):
+        """Sample the event loop lag until cancelled."""
+        self.loopThreadId = threading.get_ident()
+        stopEvent = threading.Event()
+        thread = threading.Thread(
+            target=self.watchdog, args=(stopEvent,), name="HeartbeatLagWatchdog", daemon=True
+        )
+        thread.start()
+        LOGGER.debug("Lag monitor is running")
+        try:
+            while True:
+                self.lastTick = monotonic()
+                await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+                now = monotonic()
+                self.record(max(0.0, now - self.lastTick - LAG_SAMPLE_INTERVAL), now)
+        finally:
+            stopEvent.set()
@@ -1,13 +1,12 @@
 import asyncio
 from contextlib import asynccontextmanager
 from http import HTTPStatus
-import logging
 from typing import Union
 from unittest import mock
 
 import aiohttp
 import pytest
-from pytest import LogCaptureFixture, MonkeyPatch
+from pytest import MonkeyPatch
 
 from . import constants, core
 from .heartbeat import Heartbeat
@@ -21,9 +20,29 @@ def createMockClientResponseGet(response: aiohttp.ClientResponse):
     return mockGet
 
 
+class FakeClock:
+    """A clock that only advances when `sleep` is awaited.
+
+    The loop is stopped by raising `asyncio.CancelledError` after `maxSleeps` sleeps.
+    """
+
+    def __init__(self, maxSleeps: int):
+        self.now = 0.0
+        self.sleeps = 0
+        self.maxSleeps = maxSleeps
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float):
+        if self.sleeps >= self.maxSleeps:
+            raise asyncio.CancelledError()
+        self.sleeps += 1
+        self.now += delay
+
+
 @pytest.mark.asyncio
 async def testLoopBad(
-    caplog: LogCaptureFixture,
     monkeypatch: MonkeyPatch,
     event_loop: asyncio.AbstractEventLoop,
     cogHeartbeat: Heartbeat,
@@ -31,58 +50,95 @@ async def testLoopBad(
     """Test to ensure `_loop` works as expected with bad case in which the response from the push URL is always non-OK."""
 
     # prep
-    minInterval = 1
-    maxFailedPings = 3
-    testInterval = minInterval
-    core.MAX_FAILED_PINGS = maxFailedPings
+    testInterval = 1
+    numTicks = 20
+    # pings at 1, 2, 4, 8 and 16 seconds, doubling the delay after every failure
+    expectedPingTimes = [1, 2, 4, 8, 16]
 
     # mock
     mockResponse: Union[mock.Mock, aiohttp.ClientResponse] = mock.create_autospec(
         spec=aiohttp.ClientResponse,
         status=int(HTTPStatus.INTERNAL_SERVER_ERROR),
     )
+    clock = FakeClock(maxSleeps=numTicks)
+    pingTimes = []
+    mockGet = createMockClientResponseGet(response=mockResponse)
+
+    def recordingGet(*args, **kwargs):
+        pingTimes.append(clock.now)
+        return mockGet(*args, **kwargs)
 
     # patch
-    monkeypatch.setattr(
-        target=aiohttp.ClientSession,
-        name="get",
-        value=createMockClientResponseGet(response=mockResponse),
-    )
+    monkeypatch.setattr(target=aiohttp.ClientSession, name="get", value=recordingGet)
+    monkeypatch.setattr(target=core, name="monotonic", value=clock.monotonic)
+    monkeypatch.setattr(target=asyncio, name="sleep", value=clock.sleep)
+    # no jitter
+    monkeypatch.setattr(target=core.random, name="uniform", value=lambda a, b: 1)
 
     # config
-    await cogHeartbeat.config.get_attr(constants.KEY_INSTANCE_NAME).set("test instance")
     await cogHeartbeat.config.get_attr(constants.KEY_PUSH_URL).set("test URL")
     await cogHeartbeat.config.get_attr(constants.KEY_INTERVAL).set(testInterval)
 
-    # log
-    caplog.clear()
-    caplog.set_level(level=logging.ERROR)
-
-    # mock + patch asyncio.sleep:
-    # we do not care about whether the realtime sleep duration has been as expected,
-    # but rather the fact that the loop should have done asyncio.sleep maxFailedPings
-    # times, and should stop due to maxFailedPings fails.
-    mockSleep = mock.AsyncMock()
-    monkeypatch.setattr(target=asyncio, name="sleep", value=mockSleep)
-
     # test
     try:
         await asyncio.wait_for(
             fut=event_loop.create_task(coro=cogHeartbeat._loop()),
-            timeout=testInterval * maxFailedPings * 2,
+            timeout=5,
         )
     except asyncio.TimeoutError:
-        pytest.fail(reason="The main loop should have failed, but is still running.")
+        pytest.fail(reason="The main loop should have stopped, but is still running.")
 
-    assert (
-        mockSleep.await_count == maxFailedPings + 1
-    )  # plus 1 because the loop sleeps before checking failed ping count
+    # the loop should keep running, and back off instead of stopping
+    assert clock.sleeps == numTicks
+    assert pingTimes == expectedPingTimes
+    assert cogHeartbeat.backoff["test URL"][0] == len(expectedPingTimes)
 
-    for call_args in mockSleep.call_args_list:
-        sleepDuration = call_args.kwargs.get("delay") or call_args.args[0]
-        assert sleepDuration == testInterval
 
-    assert (
-        caplog.records[-1].getMessage()
-        == f"Heartbeat main loop stopped after exceeding {maxFailedPings} failed attempts"
+@pytest.mark.asyncio
+async def testLoopGood(
+    monkeypatch: MonkeyPatch,
+    event_loop: asyncio.AbstractEventLoop,
+    cogHeartbeat: Heartbeat,
+):
+    """Test to ensure `_loop` pings every push URL on every tick, with health metrics."""
+
+    # prep
+    testInterval = 1
+    numTicks = 3
+    testUrls = ["https://example.com/a", "https://example.com/b?token=1"]
+
+    # mock
+    mockResponse: Union[mock.Mock, aiohttp.ClientResponse] = mock.create_autospec(
+        spec=aiohttp.ClientResponse,
+        status=int(HTTPStatus.OK),
     )
+    clock = FakeClock(maxSleeps=numTicks)
+    pingedUrls = []
+    mockGet = createMockClientResponseGet(response=mockResponse)
+
+    def recordingGet(_session, url, *args, **kwargs):
+        pingedUrls.append(url)
+        return mockGet(url, *args, **kwargs)
+
+    # patch
+    monkeypatch.setattr(target=aiohttp.ClientSession, name="get", value=recordingGet)
+    monkeypatch.setattr(target=core, name="monotonic", value=clock.monotonic)
+    monkeypatch.setattr(target=asyncio, name="sleep", value=clock.sleep)
+
+    # config
+    await cogHeartbeat.config.get_attr(constants.KEY_PUSH_URL).set(testUrls[0])
+    await cogHeartbeat.config.get_attr(constants.KEY_PUSH_URLS).set(testUrls)
+    await cogHeartbeat.config.get_attr(constants.KEY_INTERVAL).set(testInterval)
+
+    # test
+    await asyncio.wait_for(
+        fut=event_loop.create_task(coro=cogHeartbeat._loop()),
+        timeout=5,
+    )
+
+    assert len(pingedUrls) == numTicks * len(testUrls)
+    assert not cogHeartbeat.backoff
+    for url in pingedUrls:
+        assert url.query["guilds"] == "0"
+        assert url.query["lag"] == "0"
+    assert pingedUrls[1].query["token"] == "1"
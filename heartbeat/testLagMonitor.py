@@ -0,0 +1,64 @@
+from .constants import LAG_BUCKETS, LAG_HISTORY, SLOW_CALLBACK_THRESHOLD
+from .lagMonitor import LagMonitor
+
+
+class TestLagMonitor:
+    """Tests to ensure LagMonitor keeps lag statistics as expected."""
+
+    def testPercentile(self):
+        monitor = LagMonitor()
+        assert monitor.percentile(50) == 0.0
+
+        for _ in range(98):
+            monitor.record(0.0005, now=10)
+        monitor.record(0.3, now=10)
+        monitor.record(0.7, now=10)
+
+        assert monitor.sampleCount() == 100
+        assert monitor.percentile(50) == LAG_BUCKETS[0]
+        assert monitor.percentile(99) == 0.5
+        assert monitor.percentile(100) == 1
+        assert monitor.maxLag() == 0.7
+
+    def testPercentileOverflow(self):
+        monitor = LagMonitor()
+        monitor.record(LAG_BUCKETS[-2] * 2, now=10)
+        assert monitor.percentile(50) == float("inf")
+
+    def testRollingWindow(self):
+        monitor = LagMonitor()
+        monitor.record(0.7, now=0)
+        monitor.record(0.002, now=120)
+        assert monitor.maxLag() == 0.7
+        assert monitor.maxLag(minutes=1) == 0.002
+
+        # the first minute falls out of the window
+        monitor.record(0.002, now=LAG_HISTORY + 60)
+        assert monitor.sampleCount() == 2
+        assert monitor.maxLag() == 0.002
+        assert not monitor.topSlowCallbacks(5)
+
+    def testSlowCallbacks(self):
+        monitor = LagMonitor()
+        lag = SLOW_CALLBACK_THRESHOLD * 2
+
+        # a stall seen by the watchdog is blamed on where the loop was stuck
+        monitor.lastTick = 1
+        monitor.stall = (1, "slowA (cog/slow.py:1)")
+        monitor.record(lag, now=2)
+        monitor.lastTick = 3
+        monitor.stall = (3, "slowA (cog/slow.py:1)")
+        monitor.record(lag, now=4)
+
+        # a stall from an earlier tick is not reused
+        monitor.lastTick = 5
+        monitor.record(lag * 3, now=6)
+
+        # small lag is not a slow callback
+        monitor.record(SLOW_CALLBACK_THRESHOLD / 2, now=7)
+
+        assert monitor.topSlowCallbacks(5) == [
+            ("unknown", 1, lag * 3),
+            ("slowA (cog/slow.py:1)", 2, lag * 2),
+        ]
+        assert monitor.topSlowCallbacks(1) == [("unknown", 1, lag * 3)]
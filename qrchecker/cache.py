@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from sys import getsizeof
+from time import monotonic
+from typing import Hashable, List, Optional, Tuple
+
+
+class ResultCache:
+    """An LRU cache of QR code decode results, where entries expire after a while."""
+
+    def __init__(self, maxEntries: int, ttl: float):
+        """
+        Parameters
+        ----------
+        maxEntries: int
+            The maximum number of entries to keep.
+        ttl: float
+            The number of seconds an entry is kept for.
+        """
+        self.maxEntries = maxEntries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (expiry time, data of each QR code)
+        self._entries: "OrderedDict[Hashable, Tuple[float, List[bytes]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[List[bytes]]:
+        """Get the cached result for a key, or `None` if there is none.
+
+        This does not count towards the hit rate, see `recordLookup`.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < monotonic():
+            if entry is not None:
+                del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def recordLookup(self, hit: bool):
+        """Count a lookup towards the hit rate."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def put(self, key: Hashable, codes: List[bytes]):
+        """Cache the result for a key, evicting the least recently used entries."""
+        self._entries[key] = (monotonic() + self.ttl, codes)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxEntries:
+            self._entries.popitem(last=False)
+
+    def hitRate(self) -> float:
+        """Get the fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def memoryUsage(self) -> int:
+        """Get the approximate memory used by the cached entries, in bytes."""
+        size = getsizeof(self._entries)
+        for key, (_, codes) in self._entries.items():
+            size += getsizeof(key) + getsizeof(codes) + sum(getsizeof(code) for code in codes)
+        return size
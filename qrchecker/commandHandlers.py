@@ -37,3 +37,8 @@ class CommandHandlers(CommandsCore):
             The maximum number of pixels in an image to check.
         """
         await self.cmdQrCheckerMaxPixels(ctx=ctx, pixels=pixels)
+
+    @_grpQrChecker.command(name="cache")
+    async def _cmdQrCheckerCache(self, ctx: Context):
+        """Show decode result cache statistics"""
+        await self.cmdQrCheckerCache(ctx=ctx)
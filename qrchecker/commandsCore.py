@@ -2,7 +2,7 @@ from typing import Optional
 
 from PIL import Image
 from redbot.core.commands import Context
-from redbot.core.utils.chat_formatting import success
+from redbot.core.utils.chat_formatting import humanize_number, success
 
 from .constants import KEY_ENABLED, KEY_MAX_IMAGE_PIXELS
 from .core import Core
@@ -67,3 +67,18 @@ class CommandsCore(Core):
             await ctx.send(success(f"Max image pixels set to: **{pixels} pixels**."))
 
         await self.setMaxImagePixels(value=pixels)
+
+    async def cmdQrCheckerCache(self, ctx: Context):
+        """Show decode result cache statistics"""
+        cache = self.cache
+        msg = "\n".join(
+            (
+                "**__Decode result cache__**",
+                f"Entries: **{humanize_number(len(cache))}/{humanize_number(cache.maxEntries)}**",
+                f"Hits: **{humanize_number(cache.hits)}**",
+                f"Misses: **{humanize_number(cache.misses)}**",
+                f"Hit rate: **{cache.hitRate():.1%}**",
+                f"Approximate memory usage: **{humanize_number(cache.memoryUsage())} bytes**",
+            )
+        )
+        await ctx.send(msg)
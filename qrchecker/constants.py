@@ -3,3 +3,17 @@ KEY_MAX_IMAGE_PIXELS = "maxImagePixels"
 
 BASE_GLOBAL = {KEY_MAX_IMAGE_PIXELS: 80000000}
 BASE_GUILD = {KEY_ENABLED: False}
+
+# Decoding worker pool
+MAX_WORKERS = 2  # Number of worker processes decoding images
+MAX_QUEUED_JOBS = 8  # Images waiting for a worker before new ones are skipped
+DECODE_TIMEOUT = 10  # Time to wait for an image to be decoded, in seconds
+
+# Image size limits
+MAX_ATTACHMENT_SIZE = 16 * 1024 * 1024  # Attachments larger than this are not downloaded, in bytes
+FAST_PASS_SIZE = 1024  # Images are first decoded at most this many pixels on each side
+MAX_FRAMES = 8  # Number of frames to check in animated images
+
+# Decode result cache
+CACHE_MAX_ENTRIES = 1024  # Number of decode results to keep
+CACHE_TTL = 24 * 60 * 60  # Time to keep a decode result for, in seconds
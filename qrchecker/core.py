@@ -1,18 +1,37 @@
-from asyncio import Lock
+from asyncio import Semaphore, shield, wait_for
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from hashlib import blake2b
 from logging import getLogger
-from typing import Optional
+from typing import List, Optional
 
+from discord import Attachment
 from PIL import Image
 from redbot.core import Config
 from redbot.core.bot import Red
 
-from .constants import BASE_GLOBAL, BASE_GUILD, KEY_MAX_IMAGE_PIXELS
+from .cache import ResultCache
+from .constants import (
+    BASE_GLOBAL,
+    BASE_GUILD,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL,
+    DECODE_TIMEOUT,
+    KEY_MAX_IMAGE_PIXELS,
+    MAX_ATTACHMENT_SIZE,
+    MAX_QUEUED_JOBS,
+    MAX_WORKERS,
+)
+from .decoding import decodeImage
 
 
 class Core:
     def __init__(self, bot: Red):
         self.bot = bot
-        self.lock = Lock()
+        self.executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        # Slots for images being decoded or waiting for a worker.
+        self.jobSlots = Semaphore(MAX_WORKERS + MAX_QUEUED_JOBS)
+        self.cache = ResultCache(maxEntries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL)
         self.logger = getLogger("red.luicogs.QRChecker")
         self.config = Config.get_conf(self, identifier=5842647, force_registration=True)
         self.config.register_global(**BASE_GLOBAL)
@@ -22,6 +41,19 @@ class Core:
 
     def cog_unload(self):
         self.bgTask.cancel()
+        self.executor.shutdown(wait=False)
+
+    def resetExecutor(self, executor: ProcessPoolExecutor):
+        """Replace a broken worker pool, e.g. after a worker was killed.
+
+        Only the given pool is replaced, so that jobs failing together on the same
+        broken pool only replace it once.
+        """
+        if self.executor is not executor:
+            return
+        self.logger.error("Decoding worker pool is broken, starting a new one")
+        executor.shutdown(wait=False)
+        self.executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
 
     async def init(self):
         await self.setMaxImagePixels()
@@ -44,3 +76,77 @@ class Core:
         # `DecompressionBombError` is triggered at twice this value, hence we divide by 2.
         Image.MAX_IMAGE_PIXELS = value // 2
         self.logger.debug("Set max pixels to %s.", value)
+
+    async def decodeAttachment(self, attachment: Attachment) -> Optional[List[bytes]]:
+        """Find QR codes in an image attachment, using the worker pool.
+
+        The attachment is skipped without being downloaded if it is too large, or if
+        too many images are already waiting to be decoded.
+
+        Results are cached by a hash of the contents, so reposted images are not
+        decoded again. Attachment metadata is not used as a key, since it is chosen by
+        the poster, and could be made to match an image without QR codes.
+
+        Returns
+        -------
+        Optional[List[bytes]]
+            The data of each QR code found, or `None` if the attachment was skipped.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            If the image took longer than `DECODE_TIMEOUT` seconds to decode.
+        BrokenProcessPool
+            If a worker died while decoding. The worker pool is replaced.
+        Image.DecompressionBombError
+            If the image has more pixels than allowed.
+        """
+        if attachment.size > MAX_ATTACHMENT_SIZE:
+            self.logger.debug(
+                "Attachment %s is too large (%s bytes), skipping", attachment.id, attachment.size
+            )
+            return None
+
+        maxPixels: Optional[int] = await self.config.get_attr(KEY_MAX_IMAGE_PIXELS)()
+        if maxPixels and attachment.width and attachment.height:
+            if attachment.width * attachment.height > maxPixels:
+                self.logger.debug(
+                    "Attachment %s has too many pixels (%sx%s), skipping",
+                    attachment.id,
+                    attachment.width,
+                    attachment.height,
+                )
+                return None
+
+        if self.jobSlots.locked():
+            self.logger.warning(
+                "Too many images waiting to be decoded, skipping %s", attachment.id
+            )
+            return None
+
+        await self.jobSlots.acquire()
+        try:
+            data: bytes = await attachment.read()
+            contentKey = blake2b(data).digest()
+            codes: Optional[List[bytes]] = self.cache.get(contentKey)
+            self.cache.recordLookup(hit=codes is not None)
+            if codes is not None:
+                self.logger.debug("Found cached result for attachment %s", attachment.id)
+                self.jobSlots.release()
+                return codes
+            executor = self.executor
+            future = self.bot.loop.run_in_executor(executor, decodeImage, data, maxPixels)
+        except BaseException as error:
+            self.jobSlots.release()
+            if isinstance(error, BrokenProcessPool):
+                self.resetExecutor(executor)
+            raise
+        # Only free the slot once the worker is done, even if we stop waiting for it.
+        future.add_done_callback(lambda _: self.jobSlots.release())
+        try:
+            codes = await wait_for(shield(future), timeout=DECODE_TIMEOUT)
+        except BrokenProcessPool:
+            self.resetExecutor(executor)
+            raise
+        self.cache.put(contentKey, codes)
+        return codes
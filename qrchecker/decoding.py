@@ -0,0 +1,211 @@
+"""Image decoding for QRChecker.
+
+The functions in this module are run in worker processes, so they must be
+picklable module-level functions that only take and return plain data.
+"""
+
+from io import BytesIO
+from itertools import accumulate, combinations, groupby
+import math
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageStat
+from pyzbar.pyzbar import decode, ZBarSymbol
+
+from .constants import FAST_PASS_SIZE, MAX_FRAMES
+
+# Relative widths of the dark/light/dark/light/dark runs across a QR code finder pattern.
+FINDER_PATTERN_RATIOS = (1, 1, 3, 1, 1)
+# Maximum difference between a run and its expected width, relative to the expected width.
+FINDER_PATTERN_TOLERANCE = 0.3
+# Minimum module size of a finder pattern, in pixels. Below this, single pixels of noise
+# are mistaken for finder patterns.
+FINDER_MIN_MODULE = 1.5
+# Maximum number of finder patterns to look for in an image.
+MAX_FINDER_PATTERNS = 64
+# Maximum cosine of the angle between the corners of a QR code, about 90 +/- 10 degrees.
+FINDER_LAYOUT_COSINE = 0.17
+
+
+def findPatternCenters(line: bytes) -> List[Tuple[float, float]]:
+    """Find runs in a 1:1:3:1:1 ratio along a line of thresholded pixels.
+
+    Parameters
+    ----------
+    line: bytes
+        A row or column of pixels, where dark pixels are 255 and light pixels are 0.
+
+    Returns
+    -------
+    List[Tuple[float, float]]
+        The position of the center and the module size of each match.
+    """
+    runs = [(pixel, len(list(group))) for pixel, group in groupby(line)]
+    starts = list(accumulate([0] + [length for _, length in runs]))
+    centers = []
+    for i in range(len(runs) - 4):
+        if not runs[i][0]:
+            continue
+        window = [length for _, length in runs[i : i + 5]]
+        module = sum(window) / 7
+        if module < FINDER_MIN_MODULE:
+            continue
+        if all(
+            abs(run - ratio * module) <= ratio * module * FINDER_PATTERN_TOLERANCE
+            for run, ratio in zip(window, FINDER_PATTERN_RATIOS)
+        ):
+            centers.append((starts[i + 2] + window[2] / 2, module))
+    return centers
+
+
+def isFinderLayout(*patterns: Tuple[float, float, float]) -> bool:
+    """Check whether three finder patterns are laid out like the corners of a QR code.
+
+    The patterns must have similar module sizes, and one of them must be the corner
+    of a right angle with two equally long sides, at least 14 modules long.
+    """
+    modules = [module for _, _, module in patterns]
+    module = sum(modules) / len(modules)
+    if any(abs(other - module) > module * FINDER_PATTERN_TOLERANCE for other in modules):
+        return False
+    for i, (cornerX, cornerY, _) in enumerate(patterns):
+        (ax, ay, _), (bx, by, _) = patterns[:i] + patterns[i + 1 :]
+        side1 = math.hypot(ax - cornerX, ay - cornerY)
+        side2 = math.hypot(bx - cornerX, by - cornerY)
+        if min(side1, side2) < 14 * module:
+            continue
+        if abs(side1 - side2) > max(side1, side2) * FINDER_PATTERN_TOLERANCE:
+            continue
+        cosine = ((ax - cornerX) * (bx - cornerX) + (ay - cornerY) * (by - cornerY)) / (
+            side1 * side2
+        )
+        if abs(cosine) <= FINDER_LAYOUT_COSINE:
+            return True
+    return False
+
+
+def hasFinderPattern(image: Image.Image) -> bool:
+    """Check whether a grayscale image looks like it has a QR code.
+
+    Rows of the image are scanned for dark and light runs in a 1:1:3:1:1 ratio, and
+    each match is confirmed by the same ratio along the column through its center.
+    Three of the confirmed finder patterns must then be laid out like the corners of a
+    QR code. This is used to decide whether an image is worth decoding again at
+    full resolution.
+    """
+    threshold = ImageStat.Stat(image).mean[0]
+    # dark pixels are 255, light pixels are 0
+    binary = image.point(lambda pixel: 255 if pixel < threshold else 0)
+    width, height = binary.size
+    rows = binary.tobytes()
+    columns = binary.transpose(Image.Transpose.TRANSPOSE).tobytes()
+    columnCenters: Dict[int, List[Tuple[float, float]]] = {}
+    # (x, y, module size) of each confirmed finder pattern
+    patterns: List[Tuple[float, float, float]] = []
+
+    # every other row is enough, finder patterns are at least 7 modules tall
+    for y in range(0, height, 2):
+        for x, module in findPatternCenters(rows[y * width : (y + 1) * width]):
+            column = int(x)
+            if column not in columnCenters:
+                columnCenters[column] = findPatternCenters(
+                    columns[column * height : (column + 1) * height]
+                )
+            # the row must cross the center run of a matching vertical pattern
+            confirmed = [
+                (x, centerY, module)
+                for centerY, columnModule in columnCenters[column]
+                if abs(centerY - y) <= 1.5 * module
+                and abs(columnModule - module) <= module * FINDER_PATTERN_TOLERANCE
+            ]
+            if not confirmed:
+                continue
+            pattern = confirmed[0]
+            if any(
+                abs(x - px) <= 3.5 * pModule and abs(pattern[1] - py) <= 3.5 * pModule
+                for px, py, pModule in patterns
+            ):
+                # already found on a previous row
+                continue
+            if any(isFinderLayout(pattern, *pair) for pair in combinations(patterns, 2)):
+                return True
+            patterns.append(pattern)
+            if len(patterns) >= MAX_FINDER_PATTERNS:
+                # too busy to be worth decoding again
+                return False
+    return False
+
+
+def decodeCodes(image: Image.Image) -> List[bytes]:
+    """Get the data of each QR code in an image."""
+    return [code.data for code in decode(image, symbols=[ZBarSymbol.QRCODE])]
+
+
+def sampleFrames(numFrames: int) -> List[int]:
+    """Pick up to `MAX_FRAMES` evenly spaced frame indices out of an animation."""
+    if numFrames <= MAX_FRAMES:
+        return list(range(numFrames))
+    step = (numFrames - 1) / (MAX_FRAMES - 1)
+    return sorted({round(i * step) for i in range(MAX_FRAMES)})
+
+
+def decodeImage(data: bytes, maxPixels: Optional[int]) -> List[bytes]:
+    """Find QR codes in an image.
+
+    Each frame is first decoded as a grayscale image of at most `FAST_PASS_SIZE`
+    pixels on each side. A still image is only decoded again at full resolution if
+    that finds no QR codes, but does find what looks like the finder patterns of one.
+    For animated images, up to `MAX_FRAMES` frames are sampled, and only decoded at
+    the smaller size.
+
+    Parameters
+    ----------
+    data: bytes
+        The raw bytes of the image file.
+    maxPixels: Optional[int]
+        The maximum number of pixels in an image to check.
+
+    Returns
+    -------
+    List[bytes]
+        The data of each distinct QR code found in the image.
+
+    Raises
+    ------
+    Image.DecompressionBombError
+        If the image has more than `maxPixels` pixels.
+    """
+    # Worker processes do not share the Pillow settings of the bot process.
+    # `DecompressionBombError` is triggered at twice this value, hence we divide by 2.
+    Image.MAX_IMAGE_PIXELS = maxPixels // 2 if maxPixels else None
+
+    codes: List[bytes] = []
+    # frames to decode again at full resolution
+    retryFrames: List[int] = []
+
+    with Image.open(BytesIO(data)) as image:
+        frames = sampleFrames(getattr(image, "n_frames", 1))
+        # draft() below changes the size of JPEG images, so keep the original size
+        fullSize = image.size
+        if len(frames) == 1:
+            # lets JPEG images be decoded straight to a smaller grayscale image
+            image.draft("L", (FAST_PASS_SIZE, FAST_PASS_SIZE))
+        # frames are visited in order, so animations are only decoded once
+        for frame in frames:
+            image.seek(frame)
+            smallImage = image.convert("L")
+            smallImage.thumbnail((FAST_PASS_SIZE, FAST_PASS_SIZE))
+            frameCodes = decodeCodes(smallImage)
+            if frameCodes:
+                codes.extend(code for code in frameCodes if code not in codes)
+            elif len(frames) == 1 and smallImage.size != fullSize and hasFinderPattern(smallImage):
+                retryFrames.append(frame)
+
+    if retryFrames:
+        with Image.open(BytesIO(data)) as image:
+            for frame in retryFrames:
+                image.seek(frame)
+                frameCodes = decodeCodes(image.convert("L"))
+                codes.extend(code for code in frameCodes if code not in codes)
+
+    return codes
@@ -1,9 +1,8 @@
-from io import BytesIO
-from typing import List
+from asyncio import TimeoutError as AsyncTimeoutError, gather
+from typing import List, Optional
 
-from discord import AllowedMentions, Message
+from discord import AllowedMentions, Attachment, Message
 from PIL import Image
-from pyzbar.pyzbar import Decoded, decode, ZBarSymbol
 
 from redbot.core.commands import Context
 from redbot.core.utils.chat_formatting import box, pagify
@@ -13,6 +12,29 @@ from .core import Core
 
 
 class EventsCore(Core):
+    async def checkAttachment(self, attachment: Attachment) -> Optional[List[bytes]]:
+        """Find QR codes in an image attachment.
+
+        Errors are logged, and result in no QR codes being returned. If the attachment
+        was skipped, `None` is returned.
+        """
+        try:
+            codes: Optional[List[bytes]] = await self.decodeAttachment(attachment)
+        except AsyncTimeoutError:
+            self.logger.error("Couldn't check file, took too long to decode")
+            return []
+        except Image.DecompressionBombError as error:
+            self.logger.error("Couldn't check file, image too large: %s", error)
+            return []
+        except Exception:
+            self.logger.error("Couldn't check file.", exc_info=True)
+            return []
+
+        if codes is None:
+            return None
+        self.logger.debug("Found %s codes in attachment %s", len(codes), attachment.id)
+        return codes
+
     async def evtListener(self, message: Message):
         """Find QR code in message attachments"""
         if not self.initialized:
@@ -32,6 +54,7 @@ class EventsCore(Core):
         if not message.attachments:
             self.logger.debug("No attachments, return early")
             return
+        imageAttachments: List[Attachment] = []
         for attachment in message.attachments:
             contentType = attachment.content_type
             if not contentType:
@@ -40,89 +63,99 @@ class EventsCore(Core):
             elif contentType and "image" not in contentType:
                 self.logger.debug("Not an image, continue")
                 continue
-
             # At this point we decern that it's an image.
-            async with self.lock:
-                try:
-                    fp: BytesIO = BytesIO(await attachment.read())
-                    image: Image = Image.open(fp)
-                    codes: List[Decoded] = decode(image, symbols=[ZBarSymbol.QRCODE])
-                    self.logger.debug("Found %s codes", len(codes))
-                except Image.DecompressionBombError as error:
-                    self.logger.error("Couldn't check file, image too large: %s", error)
-                    return
-                except Exception:
-                    self.logger.error("Couldn't check file.", exc_info=True)
-                    return
-
-            if not codes:
-                self.logger.debug("No QR codes found.")
-                return
+            imageAttachments.append(attachment)
 
-            self.logger.info(
-                "%s#%s (%s) posted some QR code(s) in #%s (%s)",
-                message.author.name,
-                message.author.discriminator,
-                message.author.id,
-                message.channel.name,
-                message.channel.id,
+        # The attachments share the decoding worker pool with everything else, so
+        # checking them all at once does not use more workers.
+        results: List[Optional[List[bytes]]] = await gather(
+            *(self.checkAttachment(attachment) for attachment in imageAttachments)
+        )
+        skipped: List[str] = [
+            attachment.filename
+            for attachment, attachmentCodes in zip(imageAttachments, results)
+            if attachmentCodes is None
+        ]
+        if skipped:
+            self.logger.warning(
+                "Skipped %s of %s image attachments in message %s: %s",
+                len(skipped),
+                len(imageAttachments),
+                message.jump_url,
+                ", ".join(skipped),
             )
+        codes: List[bytes] = []
+        for attachmentCodes in results:
+            for code in attachmentCodes or []:
+                if code not in codes:
+                    codes.append(code)
 
-            numQrCodes = len(codes)
-            if numQrCodes == 1:
-                code = codes[0]
-                data: str = code.data.decode()
+        if not codes:
+            self.logger.debug("No QR codes found.")
+            return
+
+        self.logger.info(
+            "%s#%s (%s) posted some QR code(s) in #%s (%s)",
+            message.author.name,
+            message.author.discriminator,
+            message.author.id,
+            message.channel.name,
+            message.channel.id,
+        )
+
+        numQrCodes = len(codes)
+        if numQrCodes == 1:
+            code = codes[0]
+            data: str = code.decode()
+            if len(data) == 0:
+                self.logger.debug("No data in QR code.")
+                return
+            if len(data) > 1900:
+                contents = f"{data[:1900]}..."
+            else:
+                contents = data
+            msg = (
+                f"Found a QR code from {message.author.mention}, "
+                f"the contents are: {box(contents)}"
+            )
+            await message.reply(msg, mention_author=False, allowed_mentions=AllowedMentions.none())
+        else:
+            hasData: bool = False
+            pages: List[str] = []
+            pages.append(
+                f"Found several QR codes from {message.author.mention}, their contents are:"
+            )
+            for code in codes:
+                data: str = code.decode()
                 if len(data) == 0:
                     self.logger.debug("No data in QR code.")
-                    return
-                if len(data) > 1900:
-                    contents = f"{data[:1900]}..."
+                    continue
+                if len(data) > 1990:
+                    contents = f"{box(data[:1990])}..."
                 else:
-                    contents = data
-                msg = (
-                    f"Found a QR code from {message.author.mention}, "
-                    f"the contents are: {box(contents)}"
-                )
-                await message.reply(
-                    msg, mention_author=False, allowed_mentions=AllowedMentions.none()
-                )
-            else:
-                hasData: bool = False
-                pages: List[str] = []
-                pages.append(
-                    f"Found several QR codes from {message.author.mention}, their contents are:"
-                )
-                for code in codes:
-                    data: str = code.data.decode()
-                    if len(data) == 0:
-                        self.logger.debug("No data in QR code.")
-                        continue
-                    if len(data) > 1990:
-                        contents = f"{box(data[:1990])}..."
-                    else:
-                        contents = f"{box(data)}"
-                    pages.append(contents)
-                    hasData |= True
-
-                if not hasData:
-                    self.logger.debug("No data in %s QR codes.", numQrCodes)
-                    return
-
-                firstMessage: bool = True
-                sentMessages: int = 0
-
-                ctx: Context = await self.bot.get_context(message)
-                for textToSend in pagify("\n".join(pages), escape_mass_mentions=True):
-                    if firstMessage:
-                        await message.reply(
-                            textToSend,
-                            mention_author=False,
-                            allowed_mentions=AllowedMentions.none(),
-                        )
-                        firstMessage = False
-                    elif sentMessages > 10:
-                        self.logger.debug("Sent more than 10 messages, bail early")
-                        break
-                    else:
-                        await ctx.send(textToSend, allowed_mentions=AllowedMentions.none())
-                    sentMessages += 1
+                    contents = f"{box(data)}"
+                pages.append(contents)
+                hasData |= True
+
+            if not hasData:
+                self.logger.debug("No data in %s QR codes.", numQrCodes)
+                return
+
+            firstMessage: bool = True
+            sentMessages: int = 0
+
+            ctx: Context = await self.bot.get_context(message)
+            for textToSend in pagify("\n".join(pages), escape_mass_mentions=True):
+                if firstMessage:
+                    await message.reply(
+                        textToSend,
+                        mention_author=False,
+                        allowed_mentions=AllowedMentions.none(),
+                    )
+                    firstMessage = False
+                elif sentMessages > 10:
+                    self.logger.debug("Sent more than 10 messages, bail early")
+                    break
+                else:
+                    await ctx.send(textToSend, allowed_mentions=AllowedMentions.none())
+                sentMessages += 1
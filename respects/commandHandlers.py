@@ -1,3 +1,4 @@
+from discord import Message, RawBulkMessageDeleteEvent, RawMessageDeleteEvent
 from redbot.core import checks, commands
 from redbot.core.commands.context import Context
 
@@ -51,3 +52,15 @@ class CommandHandlers(CommandsCore):
         """
 
         await self.cmdSetFTime(ctx=ctx, seconds=seconds)
+
+    @commands.Cog.listener("on_message")
+    async def _evtOnMessage(self, message: Message) -> None:
+        self.trackMessage(message)
+
+    @commands.Cog.listener("on_raw_message_delete")
+    async def _evtOnRawMessageDelete(self, payload: RawMessageDeleteEvent) -> None:
+        self.untrackMessages(payload.channel_id, (payload.message_id,))
+
+    @commands.Cog.listener("on_raw_bulk_message_delete")
+    async def _evtOnRawBulkMessageDelete(self, payload: RawBulkMessageDeleteEvent) -> None:
+        self.untrackMessages(payload.channel_id, payload.message_ids)
@@ -1,8 +1,11 @@
+from typing import Optional
+
+from discord import MessageReference
 from discord.errors import NotFound, HTTPException
 from redbot.core.commands.context import Context
 from redbot.core.config import Group
 
-from .constants import KEY_MSGS_BETWEEN, KEY_TIME_BETWEEN
+from .constants import KEY_MSGS_BETWEEN, KEY_TIME_BETWEEN, MAX_MSGS_BETWEEN
 from .core import Core
 
 
@@ -11,16 +14,38 @@ class CommandsCore(Core):
         """Pay your respects."""
 
         async with self.plusFLock:
-            if not await self.checkLastRespect(ctx):
+            queuedReference: Optional[MessageReference] = self.getQueuedRespectReference(ctx)
+            currentReference: Optional[MessageReference] = ctx.message.reference
+            if (
+                queuedReference
+                and currentReference
+                and queuedReference.message_id != currentReference.message_id
+            ):
+                # Respects are being paid to a different message, post the queued ones first
+                await self.flushRespects(ctx.channel.id)
+
+            if ctx.author.id in self.getQueuedRespectUsers(ctx):
+                alreadyPaid = True
+            elif self.getQueuedRespectUsers(ctx):
+                # Respects are being paid in this channel right now
+                alreadyPaid = await self.checkIfUserPaidRespect(ctx)
+            elif not await self.checkLastRespect(ctx):
                 # New respects to be paid
-                await self.payRespects(ctx)
-            elif not await self.checkIfUserPaidRespect(ctx):
-                # Respects exists, user has not paid their respects yet.
-                await self.payRespects(ctx)
+                alreadyPaid = False
+            else:
+                # Respects exists, check if the user has paid their respects yet.
+                alreadyPaid = await self.checkIfUserPaidRespect(ctx)
+
+            if not alreadyPaid:
+                self.queueRespect(ctx)
             elif ctx.interaction is not None:
                 await ctx.send("You have already paid your respects!", ephemeral=True)
                 return
 
+        if ctx.interaction is not None:
+            await ctx.send("You have paid your respects!", ephemeral=True)
+            return
+
         try:
             await ctx.message.delete()
         except NotFound:
@@ -34,12 +59,14 @@ class CommandsCore(Core):
         Parameters:
         -----------
         messages: int
-            The number of messages between messages.  Should be between 1 and 100
+            The number of messages between messages.  Should be between 1 and
+            `MAX_MSGS_BETWEEN`
         """
 
-        if messages < 1 or messages > 100:
+        if messages < 1 or messages > MAX_MSGS_BETWEEN:
             await ctx.send(
-                ":negative_squared_cross_mark: Please enter a number between 1 and 100!"
+                ":negative_squared_cross_mark: Please enter a number between 1 and "
+                f"{MAX_MSGS_BETWEEN}!"
             )
             return
 
@@ -16,6 +16,8 @@ KEY_TIME_BETWEEN: Final[str] = "timeSinceLastRespect"
 KEY_MSGS_BETWEEN: Final[str] = "msgsSinceLastRespect"
 DEFAULT_TIME_BETWEEN: Final[float] = 30.0  # Time between paid respects in seconds
 DEFAULT_MSGS_BETWEEN: Final[int] = 20  # The number of messages in between
+MAX_MSGS_BETWEEN: Final[int] = 100  # The most messages in between that can be set
+RESPECTS_DEBOUNCE_TIME: Final[float] = 3.0  # Time to gather respects into one update
 
 
 class BaseGuild(TypedDict):
@@ -33,16 +35,19 @@ BASE_GUILD: Final[BaseGuild] = {
 KEY_MSG: Final[str] = "msg"
 KEY_TIME: Final[str] = "time"
 KEY_USERS: Final[str] = "users"
+KEY_REFERENCE: Final[str] = "reference"
 
 
 class BaseChannel(TypedDict):
     msg: Optional[int]
     time: Optional[float]
     users: List[int]
+    reference: Optional[int]
 
 
 BASE_CHANNEL: Final[BaseChannel] = {
     KEY_MSG: None,
     KEY_TIME: None,
     KEY_USERS: [],
+    KEY_REFERENCE: None,
 }
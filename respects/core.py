@@ -1,10 +1,11 @@
 import os
-from asyncio import Lock
+from asyncio import Lock, Task, current_task, sleep
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 from logging import FileHandler, Formatter, Logger, getLogger
 from pathlib import Path
 from random import choice
-from typing import List, Optional
+from typing import DefaultDict, Deque, Dict, Iterable, List, Optional
 from discord import Embed, Guild, Member, Message, MessageReference
 from discord.errors import NotFound, HTTPException
 from redbot.core import Config, data_manager
@@ -16,6 +17,16 @@ from redbot.core.utils.chat_formatting import humanize_list
 from .constants import *
 
 
+class RespectBatch:
+    """Respects paid in a channel in quick succession, waiting to be posted together."""
+
+    def __init__(self, ctx: Context) -> None:
+        self.ctx: Context = ctx
+        self.userIds: List[int] = [ctx.author.id]
+        self.reference: Optional[MessageReference] = ctx.message.reference
+        self.task: Optional[Task] = None
+
+
 class Core:
     def __init__(self, bot: Red) -> None:
         self.bot: Red = bot
@@ -27,6 +38,12 @@ class Core:
         )
         self.config.register_guild(**BASE_GUILD)
         self.config.register_channel(**BASE_CHANNEL)
+        # Channel ID -> IDs of the most recent messages in the channel, oldest first.
+        self.recentMsgIds: DefaultDict[int, Deque[int]] = defaultdict(
+            lambda: deque(maxlen=MAX_MSGS_BETWEEN + 1)
+        )
+        # Channel ID -> respects that have not been posted yet.
+        self.respectBatches: Dict[int, RespectBatch] = {}
 
         # Initialize logger and save to cog folder.
         saveFolder: Path = data_manager.cog_data_path(cog_instance=self)
@@ -43,6 +60,28 @@ class Core:
             )
             self.logger.addHandler(handler)
 
+    def cancelQueuedRespects(self) -> None:
+        """Cancel posting respects that are still queued."""
+        for batch in self.respectBatches.values():
+            if batch.task:
+                batch.task.cancel()
+
+    def trackMessage(self, message: Message) -> None:
+        """Remember a new message, so that messages between respects can be counted."""
+        if message.guild:
+            self.recentMsgIds[message.channel.id].append(message.id)
+
+    def untrackMessages(self, channelId: int, messageIds: Iterable[int]) -> None:
+        """Forget deleted messages, so that they are not counted between respects."""
+        recentMsgIds: Optional[Deque[int]] = self.recentMsgIds.get(channelId)
+        if not recentMsgIds:
+            return
+        deletedIds = set(messageIds)
+        remainingIds = [msgId for msgId in recentMsgIds if msgId not in deletedIds]
+        if len(remainingIds) != len(recentMsgIds):
+            recentMsgIds.clear()
+            recentMsgIds.extend(remainingIds)
+
     async def checkLastRespect(self, ctx: Context) -> bool:
         """Check to see if respects have been paid already.
 
@@ -53,13 +92,15 @@ class Core:
         --------
         This method returns `False` if:
         - No respects have been paid in the channel before, or
-        - The last respect could not be retrieved, or
         - The current respect is paid to a message that is different from
           the message to which the last respect was paid, or
         - The time exceeds the threshold AND the last respect in the channel was behind
           more than a certain number of messages.
 
         Otherwise, this method returns `True`.
+
+        The checks are answered from config and the recently seen messages of
+        the channel, without any API calls.
         """
 
         chConfig: Group = self.config.channel(ctx.channel)
@@ -69,47 +110,24 @@ class Core:
 
         if not oldRespectMsgId:
             return False
-        else:
-            oldRespect: Optional[Message] = None
-            try:
-                oldRespect = await ctx.channel.fetch_message(oldRespectMsgId)
-            except (NotFound, HTTPException) as e:
-                # in any of these cases, we assume the old respect is lost
-                # and past data should be cleared
+
+        currentReference: Optional[MessageReference] = ctx.message.reference
+        if currentReference:
+            oldReferenceId: Optional[int] = await chConfig.get_attr(KEY_REFERENCE)()
+            if oldReferenceId != currentReference.message_id:
+                self.logger.debug("Two most recent respects were paid to two different messages")
+                self.logger.debug("Resetting the respect chain")
                 await chConfig.clear()
-                if isinstance(e, NotFound):
-                    self.logger.debug("Could not find the old respect")
-                else:
-                    self.logger.error("Could not retrieve the old respect", exc_info=True)
                 return False
-            else:
-                oldReference: Optional[MessageReference] = None
-                if oldRespect:
-                    oldReference = oldRespect.reference
-
-                currentRespect: Message = ctx.message
-                currentReference: Optional[MessageReference] = currentRespect.reference
-
-                if currentReference:
-                    if not oldReference or oldReference.message_id != currentReference.message_id:
-                        self.logger.debug(
-                            "Two most recent respects were paid to two different messages"
-                        )
-                        self.logger.debug("Resetting the respect chain")
-                        await chConfig.clear()
-                        return False
 
         confMsgsBetween: int = await guildConfig.get_attr(KEY_MSGS_BETWEEN)()
         confTimeBetween: float = await guildConfig.get_attr(KEY_TIME_BETWEEN)()
         oldRespectTime: float = await chConfig.get_attr(KEY_TIME)()
 
-        prevMsgIds: List[int] = []
-
-        async for msg in ctx.channel.history(
-            limit=confMsgsBetween,
-            before=ctx.message,
-        ):
-            prevMsgIds.append(msg.id)
+        # the most recent messages before this respect, newest last
+        prevMsgIds: List[int] = [
+            msgId for msgId in self.recentMsgIds[ctx.channel.id] if msgId < ctx.message.id
+        ][-confMsgsBetween:]
 
         exceedMessages: bool = oldRespectMsgId not in prevMsgIds
         exceedTime: bool = datetime.now() - datetime.fromtimestamp(oldRespectTime) > timedelta(
@@ -143,27 +161,97 @@ class Core:
             return True
         return False
 
-    async def payRespects(self, ctx: Context) -> None:
-        """Pay respects.
+    def queueRespect(self, ctx: Context) -> None:
+        """Queue a respect to be posted with the others paid in the same channel.
+
+        The respects are posted together once `RESPECTS_DEBOUNCE_TIME` seconds have
+        passed since the first one. This must be called with `plusFLock` held, and
+        assumes that `checkLastRespect` has been invoked.
+        """
+        batch: Optional[RespectBatch] = self.respectBatches.get(ctx.channel.id)
+        if batch:
+            batch.userIds.append(ctx.author.id)
+            batch.ctx = ctx
+            if not batch.reference:
+                batch.reference = ctx.message.reference
+            return
+
+        batch = RespectBatch(ctx)
+        batch.task = self.bot.loop.create_task(self.flushRespectsLater(ctx.channel.id))
+        self.respectBatches[ctx.channel.id] = batch
+
+    async def flushRespectsLater(self, channelId: int) -> None:
+        """Post the queued respects of a channel after the debounce time."""
+        await sleep(RESPECTS_DEBOUNCE_TIME)
+        async with self.plusFLock:
+            try:
+                await self.flushRespects(channelId)
+            except Exception:  # pylint: disable=broad-except
+                self.logger.error("Could not pay queued respects", exc_info=True)
 
-        This assumes that `checkLastRespectTime` has been invoked.
+    async def flushRespects(self, channelId: int) -> None:
+        """Post the queued respects of a channel right away.
 
+        This must be called with `plusFLock` held.
+        """
+        batch: Optional[RespectBatch] = self.respectBatches.pop(channelId, None)
+        if not batch:
+            return
+        if batch.task and batch.task is not current_task():
+            batch.task.cancel()
+        await self.payRespects(batch.ctx, batch.userIds, batch.reference)
+
+    def getQueuedRespectUsers(self, ctx: Context) -> List[int]:
+        """Get the users with respects queued in the current channel."""
+        batch: Optional[RespectBatch] = self.respectBatches.get(ctx.channel.id)
+        return batch.userIds if batch else []
+
+    def getQueuedRespectReference(self, ctx: Context) -> Optional[MessageReference]:
+        """Get the reference of the respects queued in the current channel, if any."""
+        batch: Optional[RespectBatch] = self.respectBatches.get(ctx.channel.id)
+        return batch.reference if batch else None
+
+    async def payRespects(
+        self,
+        ctx: Context,
+        userIds: List[int],
+        reference: Optional[MessageReference],
+    ) -> None:
+        """Pay respects.
+
+        The respect message is edited in place if it is still the latest message
+        in the channel, otherwise it is deleted and sent again.
+
+        Parameters:
+        -----------
+        ctx: Context
+            The context of the most recent respect.
+        userIds: List[int]
+            The users paying their respects, in the order they paid them.
+        reference: Optional[MessageReference]
+            The message the respects are paid to, if any.
         """
         async with self.config.channel(ctx.channel).all() as chData:
-            chData[KEY_USERS].append(ctx.author.id)
+            chData[KEY_USERS].extend(userIds)
             chData[KEY_TIME] = datetime.now().timestamp()
 
-            oldReference: Optional[MessageReference] = None
+            oldReferenceId: Optional[int] = chData[KEY_REFERENCE]
+            oldRespectMsgId: Optional[int] = chData[KEY_MSG]
+            recentMsgIds: Deque[int] = self.recentMsgIds[ctx.channel.id]
+            editInPlace: bool = bool(
+                oldRespectMsgId
+                and recentMsgIds
+                and recentMsgIds[-1] == oldRespectMsgId
+                and (not reference or reference.message_id == oldReferenceId)
+            )
 
-            if chData[KEY_MSG]:
+            if oldRespectMsgId and not editInPlace:
                 try:
-                    oldRespect: Message = await ctx.channel.fetch_message(chData[KEY_MSG])
-                    oldReference = oldRespect.reference if oldRespect else None
-                    await oldRespect.delete()
+                    await ctx.channel.get_partial_message(oldRespectMsgId).delete()
                 except NotFound:
                     self.logger.debug("Could not find the old respect")
                 except HTTPException:
-                    self.logger.error("Could not retrieve the old respect", exc_info=True)
+                    self.logger.error("Could not delete the old respect", exc_info=True)
                 finally:
                     chData[KEY_MSG] = None
 
@@ -182,18 +270,32 @@ class Core:
                 heartEmote=choice(HEARTS),
             )
 
-            newReference: Optional[MessageReference] = (
-                ctx.message.reference if ctx.message.reference else oldReference
-            )
+            newReference: Optional[MessageReference] = reference
+            if not newReference and oldReferenceId:
+                newReference = MessageReference(
+                    message_id=oldReferenceId,
+                    channel_id=ctx.channel.id,
+                    guild_id=currentGuild.id,
+                )
             if newReference:
                 newReference.fail_if_not_exists = False
 
             messageEmbed: Embed = Embed(description=message)
             messageEmbed.set_footer(text=f"Use {ctx.clean_prefix}f to pay respects")
 
-            messageObj: Message = await ctx.send(
+            if editInPlace:
+                try:
+                    await ctx.channel.get_partial_message(oldRespectMsgId).edit(embed=messageEmbed)
+                except HTTPException:
+                    self.logger.debug("Could not edit the old respect", exc_info=True)
+                    chData[KEY_MSG] = None
+                else:
+                    return
+
+            messageObj: Message = await ctx.channel.send(
                 embed=messageEmbed,
                 reference=newReference,
                 mention_author=False,
             )
             chData[KEY_MSG] = messageObj.id
+            chData[KEY_REFERENCE] = newReference.message_id if newReference else None
@@ -9,3 +9,6 @@ from .commandHandlers import CommandHandlers
 
 class Respects(commands.Cog, CommandHandlers):
     """Pay your respects."""
+
+    def cog_unload(self) -> None:
+        self.cancelQueuedRespects()
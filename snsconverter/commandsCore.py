@@ -9,6 +9,7 @@ class CommandsCore(Core):
         enabledCfg = self.config.guild(ctx.guild).get_attr(KEY_ENABLED)
         enabled = not await enabledCfg()
         await enabledCfg.set(enabled)
+        self.enabled_cache[ctx.guild.id] = enabled
 
         status = "enabled" if enabled else "disabled"
         await ctx.send(f"SNSConverter replacements are now {status}.")
@@ -1,11 +1,46 @@
 import enum
 import re
+from typing import NamedTuple, Pattern, Tuple
 
 KEY_ENABLED = "enabled"
 DEFAULT_GUILD = {KEY_ENABLED: False}
-INSTA_REGEX_PATTERN = re.compile(r"https://(?:www\.)?(instagram.com)")
+# number of messages to remember converted URLs for
+MAX_TRACKED_MESSAGES = 512
 
 
 class SocialMedia(enum.Enum):
     INSTAGRAM = "Instagram"
     TWITTER = "Twitter"
+    TIKTOK = "TikTok"
+
+
+class ConversionRule(NamedTuple):
+    """A rule to rewrite the embed URLs of a social media to a better embedding site."""
+
+    social_media: SocialMedia
+    # matched against the start of the embed URL, up to the end of the host name
+    pattern: Pattern[str]
+    # replaces the matched part of the embed URL
+    replacement: str
+    # only convert embeds with a video
+    video_only: bool = False
+
+
+CONVERSION_RULES: Tuple[ConversionRule, ...] = (
+    ConversionRule(
+        SocialMedia.INSTAGRAM,
+        re.compile(r"https://(?:www\.)?(instagram\.com)(?=[/?#]|$)"),
+        r"https://dd\1",
+    ),
+    ConversionRule(
+        SocialMedia.TWITTER,
+        re.compile(r"https://(?:www\.)?(?:twitter|x)\.com(?=[/?#]|$)"),
+        "https://vxtwitter.com",
+        video_only=True,
+    ),
+    ConversionRule(
+        SocialMedia.TIKTOK,
+        re.compile(r"https://((?:www\.|vm\.)?)tiktok\.com(?=[/?#]|$)"),
+        r"https://\1vxtiktok.com",
+    ),
+)
@@ -1,10 +1,14 @@
 import logging
 import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Set
+
+from discord import Guild
 
 from redbot.core import Config, data_manager
 from redbot.core.bot import Red
 
-from .constants import DEFAULT_GUILD
+from .constants import DEFAULT_GUILD, KEY_ENABLED, MAX_TRACKED_MESSAGES
 
 
 class Core:
@@ -14,6 +18,10 @@ class Core:
 
         self.config = Config.get_conf(self, identifier=5842647, force_registration=True)
         self.config.register_guild(**DEFAULT_GUILD)
+        # guild ID -> whether replacements are enabled, loaded from config on first use
+        self.enabled_cache: Dict[int, bool] = {}
+        # message ID -> normalized URLs already converted, for recent messages only
+        self.converted_urls: "OrderedDict[int, Set[str]]" = OrderedDict()
 
         # Initialize logger, and save to cog folder.
         save_folder = data_manager.cog_data_path(cog_instance=self)
@@ -25,3 +33,22 @@ class Core:
                 logging.Formatter("%(asctime)s %(message)s", datefmt="[%d/%m/%Y %H:%M:%S]")
             )
             self.logger.addHandler(handler)
+
+    async def is_enabled(self, guild: Guild) -> bool:
+        """Check whether replacements are enabled in a guild."""
+        enabled = self.enabled_cache.get(guild.id)
+        if enabled is None:
+            enabled = await self.config.guild(guild).get_attr(KEY_ENABLED)()
+            self.enabled_cache[guild.id] = enabled
+        return enabled
+
+    def get_converted_urls(self, message_id: int) -> Set[str]:
+        """Get the normalized URLs already converted for a message."""
+        return self.converted_urls.get(message_id, set())
+
+    def add_converted_urls(self, message_id: int, url_keys: Iterable[str]):
+        """Remember normalized URLs converted for a message, forgetting the oldest messages."""
+        self.converted_urls.setdefault(message_id, set()).update(url_keys)
+        self.converted_urls.move_to_end(message_id)
+        while len(self.converted_urls) > MAX_TRACKED_MESSAGES:
+            self.converted_urls.popitem(last=False)
@@ -1,16 +1,18 @@
-from discord import Message
+from typing import Dict, List, Set
 
-from .constants import KEY_ENABLED, SocialMedia
+from discord import Embed, Message
+
+from .constants import SocialMedia
 from .core import Core
-from .helpers import convert_to_ddinsta_url, convert_to_vx_twitter_url, urls_to_string, valid
+from .helpers import convert_url, normalize_url, urls_to_string, valid
 
 
 class EventsCore(Core):
-    async def _on_message_insta_replacer(self, message: Message):
+    async def _on_message_replacer(self, message: Message):
         if not valid(message):
             return
 
-        if not await self.config.guild(message.guild).get_attr(KEY_ENABLED)():
+        if not await self.is_enabled(message.guild):
             self.logger.debug(
                 "SNSConverter disabled for guild %s (%s), skipping",
                 message.guild.name,
@@ -18,23 +20,13 @@ class EventsCore(Core):
             )
             return
 
-        ddinsta_urls = convert_to_ddinsta_url(message.embeds)
-
-        if not ddinsta_urls:
-            return
+        await self._reply_with_converted_urls(message, message.embeds)
 
-        # constructs the message and replies with a mention
-        ok = await message.reply(urls_to_string(ddinsta_urls, SocialMedia.INSTAGRAM))
-
-        # Remove embeds from user message if reply is successful
-        if ok:
-            await message.edit(suppress=True)
-
-    async def _on_edit_insta_replacer(self, message_before: Message, message_after: Message):
+    async def _on_edit_replacer(self, message_before: Message, message_after: Message):
         if not valid(message_after):
             return
 
-        if not await self.config.guild(message_after.guild).get_attr(KEY_ENABLED)():
+        if not await self.is_enabled(message_after.guild):
             self.logger.debug(
                 "SNSConverter disabled for guild %s (%s), skipping",
                 message_after.guild.name,
@@ -42,84 +34,53 @@ class EventsCore(Core):
             )
             return
 
+        # embeds are compared by URL and whether they have a video, which is much
+        # cheaper than comparing whole embeds; an embed that gains a video is new
+        old_embed_keys = {
+            (normalize_url(embed.url), bool(embed.video)) for embed in message_before.embeds
+        }
         new_embeds = [
-            embed for embed in message_after.embeds if embed not in message_before.embeds
+            embed
+            for embed in message_after.embeds
+            if (normalize_url(embed.url), bool(embed.video)) not in old_embed_keys
         ]
 
         # skips if the message has no new embeds
         if not new_embeds:
             return
 
-        ddinsta_urls = convert_to_ddinsta_url(new_embeds)
-
-        if not ddinsta_urls:
-            return
-
-        # constructs the message and replies with a mention
-        ok = await message_after.reply(urls_to_string(ddinsta_urls, SocialMedia.INSTAGRAM))
-
-        # Remove embeds from user message if reply is successful
-        if ok:
-            await message_after.edit(suppress=True)
-
-    async def _on_message_twit_replacer(self, message: Message):
-        if not valid(message):
-            return
-
-        if not await self.config.guild(message.guild).get_attr(KEY_ENABLED)():
-            self.logger.debug(
-                "SNSConverter disabled for guild %s (%s), skipping",
-                message.guild.name,
-                message.guild.id,
-            )
-            return
-
-        # the actual code part
-        vx_twtter_urls = convert_to_vx_twitter_url(message.embeds)
+        await self._reply_with_converted_urls(message_after, new_embeds)
+
+    async def _reply_with_converted_urls(self, message: Message, embeds: List[Embed]):
+        """Reply with the converted URLs of the embeds, if there are any.
+
+        Embeds with URLs that were already converted for this message are skipped.
+        """
+        converted_keys = self.get_converted_urls(message.id)
+        converted: Dict[SocialMedia, List[str]] = {}
+        # only embeds that were converted are recorded, so that an embed that is not
+        # convertible yet, like a tweet whose video has not loaded, is converted later
+        new_keys: Set[str] = set()
+        for embed in embeds:
+            url_key = normalize_url(embed.url)
+            if url_key in converted_keys or url_key in new_keys:
+                continue
+            result = convert_url(embed)
+            if result:
+                social_media, new_url = result
+                converted.setdefault(social_media, []).append(new_url)
+                new_keys.add(url_key)
 
         # no changed urls detected
-        if not vx_twtter_urls:
-            return
-
-        # constructs the message and replies with a mention
-        ok = await message.reply(urls_to_string(vx_twtter_urls, SocialMedia.TWITTER))
-
-        # Remove embeds from user message if reply is successful
-        if ok:
-            await message.edit(suppress=True)
-
-    async def _on_edit_twit_replacer(self, message_before: Message, message_after: Message):
-        # skips if the message is sent by any bot
-        if not valid(message_after):
-            return
-
-        if not await self.config.guild(message_after.guild).get_attr(KEY_ENABLED)():
-            self.logger.debug(
-                "SNSConverter disabled for guild %s (%s), skipping",
-                message_after.guild.name,
-                message_after.guild.id,
-            )
+        if not converted:
             return
 
-        video_embed_before = [embed for embed in message_before.embeds if embed.video]
-        video_embed_after = [embed for embed in message_after.embeds if embed.video]
-        new_video_embeds = [
-            embed for embed in video_embed_after if embed not in video_embed_before
-        ]
-
-        # skips if the message has no new embeds
-        if not new_video_embeds:
-            return
-
-        vx_twtter_urls = convert_to_vx_twitter_url(new_video_embeds)
-
-        # no changed urls detected
-        if not vx_twtter_urls:
-            return
+        urls = [url for social_media_urls in converted.values() for url in social_media_urls]
 
         # constructs the message and replies with a mention
-        ok = await message_after.reply(urls_to_string(vx_twtter_urls, SocialMedia.TWITTER))
+        ok = await message.reply(urls_to_string(urls, list(converted)))
+        self.add_converted_urls(message.id, new_keys)
 
         # Remove embeds from user message if reply is successful
         if ok:
-            await message_after.edit(suppress=True)
+            await message.edit(suppress=True)
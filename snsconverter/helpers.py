@@ -1,63 +1,63 @@
-import re
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
 from discord import Embed, Message, channel
+from redbot.core.utils.chat_formatting import humanize_list
 
-from .constants import INSTA_REGEX_PATTERN, SocialMedia
+from .constants import CONVERSION_RULES, SocialMedia
 
 
-def convert_to_ddinsta_url(embeds: list[Embed]):
+def convert_url(embed: Embed) -> Optional[Tuple[SocialMedia, str]]:
     """
     Parameters
     ----------
-    embeds: list of Discord embeds
+    embed: Discord embed
 
     Returns
     -------
-        filtered list of Instagram URLs that have been converted to ddinstagram
+        The social media and converted URL of the embed, or None if no rule matches
     """
-
-    # pulls only video embeds from list of embeds
-    urls = [entry.url for entry in embeds]
-
-    ddinsta_urls = [
-        re.sub(INSTA_REGEX_PATTERN, r"https://dd\1", result)
-        for result in urls
-        if re.match(INSTA_REGEX_PATTERN, result)
-    ]
-
-    return ddinsta_urls
-
-
-def convert_to_vx_twitter_url(embeds: list[Embed]):
+    if not embed.url:
+        return None
+    # the first matching rule wins
+    for rule in CONVERSION_RULES:
+        if rule.video_only and not embed.video:
+            continue
+        match = rule.pattern.match(embed.url)
+        if match:
+            return rule.social_media, match.expand(rule.replacement) + embed.url[match.end() :]
+    return None
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
     """
     Parameters
     ----------
-    embeds: list of Discord embeds
+    url: Optional[str]
+        An embed URL
 
     Returns
     -------
-        filtered list of twitter URLs that have been converted to vxtwitter
+        A key that is the same for URLs that point to the same post, ignoring case
+        in the host name, "www.", trailing slashes, query strings and fragments, or
+        None if there is no URL
     """
-
-    # pulls only video embeds from list of embeds
-    urls = [entry.url for entry in embeds if entry.video]
-
-    vxtwitter_urls = [
-        result.replace("https://twitter.com", "https://vxtwitter.com")
-        for result in urls
-        if "https://twitter.com" in result
-    ]
-
-    return vxtwitter_urls
+    if not url:
+        return None
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}"
 
 
-def urls_to_string(links: list[str], socialMedia: SocialMedia):
+def urls_to_string(links: List[str], socialMedia: List[SocialMedia]):
     """
     Parameters
     ----------
-    links: list[str]
+    links: List[str]
         A list of urls
-    socialMedia: SocialMedia
+    socialMedia: List[SocialMedia]
         The social media to replace.
 
     Returns
@@ -67,7 +67,7 @@ def urls_to_string(links: list[str], socialMedia: SocialMedia):
     return "\n".join(
         [
             "OwO what's this?",
-            f"*notices your terrible {socialMedia.value} embeds*",
+            f"*notices your terrible {humanize_list([sm.value for sm in socialMedia])} embeds*",
             "Here's a better alternative:",
             *links,
         ]
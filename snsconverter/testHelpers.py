@@ -0,0 +1,93 @@
+from typing import Optional
+
+from discord import Embed
+import pytest
+
+from .constants import SocialMedia
+from .helpers import convert_url, normalize_url
+
+
+def makeEmbed(url: Optional[str], video: bool = False) -> Embed:
+    data = {"type": "rich"}
+    if url:
+        data["url"] = url
+    if video:
+        data["video"] = {"url": "https://video.example.com/video.mp4"}
+    return Embed.from_dict(data)
+
+
+class TestConvertUrl:
+    """Tests to ensure convert_url() rewrites embed URLs as expected."""
+
+    @pytest.mark.parametrize(
+        ["url", "video", "expected"],
+        [
+            (
+                "https://www.instagram.com/p/abc/",
+                False,
+                (SocialMedia.INSTAGRAM, "https://ddinstagram.com/p/abc/"),
+            ),
+            (
+                "https://instagram.com/reel/abc?igsh=123",
+                False,
+                (SocialMedia.INSTAGRAM, "https://ddinstagram.com/reel/abc?igsh=123"),
+            ),
+            (
+                "https://twitter.com/user/status/1",
+                True,
+                (SocialMedia.TWITTER, "https://vxtwitter.com/user/status/1"),
+            ),
+            (
+                "https://x.com/user/status/1",
+                True,
+                (SocialMedia.TWITTER, "https://vxtwitter.com/user/status/1"),
+            ),
+            (
+                "https://vm.tiktok.com/abc/",
+                False,
+                (SocialMedia.TIKTOK, "https://vm.vxtiktok.com/abc/"),
+            ),
+            (
+                "https://www.tiktok.com/@user/video/1",
+                False,
+                (SocialMedia.TIKTOK, "https://www.vxtiktok.com/@user/video/1"),
+            ),
+            ("https://instagram.com", False, (SocialMedia.INSTAGRAM, "https://ddinstagram.com")),
+        ],
+    )
+    def testGoodCases(self, url, video, expected):
+        assert convert_url(makeEmbed(url, video)) == expected
+
+    @pytest.mark.parametrize(
+        ["url", "video"],
+        [
+            # tweets are only converted if they have a video
+            ("https://twitter.com/user/status/1", False),
+            # host names that only start with a social media domain
+            ("https://instagram.com.evil.com/p/abc", False),
+            ("https://x.company.com/x", True),
+            ("https://tiktok.community/abc", False),
+            ("https://example.com/instagram.com", False),
+            (None, True),
+        ],
+    )
+    def testBadCases(self, url, video):
+        assert convert_url(makeEmbed(url, video)) is None
+
+
+class TestNormalizeUrl:
+    """Tests to ensure normalize_url() gives the same key for the same post."""
+
+    @pytest.mark.parametrize(
+        ["url", "expected"],
+        [
+            ("https://www.Instagram.com/p/abc/", "instagram.com/p/abc"),
+            ("https://instagram.com/p/abc?igsh=123#top", "instagram.com/p/abc"),
+            ("https://x.com/user/status/1", "x.com/user/status/1"),
+            ("https://x.com", "x.com"),
+            (None, None),
+            ("", None),
+        ],
+    )
+    def testNormalize(self, url, expected):
+        assert normalize_url(url) == expected
@@ -3,8 +3,11 @@
 Collect some stats for ourselves.
 """
 
+import asyncio
+from collections import defaultdict
 from datetime import datetime
 import logging
+from typing import DefaultDict, Dict, List, Optional, Set, Tuple
 import discord
 from redbot.core import Config, checks, commands, data_manager
 from redbot.core.bot import Red
@@ -26,6 +29,10 @@ BASE_CHANNEL = \
     "lastUpdated": None
 }
 
+FLUSH_TIME = 5 * 60  # How often to save live message counts, in seconds
+PAGE_SIZE = 100  # Number of history messages to count between checkpoints
+MAX_CONCURRENT_CHANNELS = 5  # Number of channels to crawl at once
+
 
 class Stats(commands.Cog):
     """A cog to collect statistics within a guild."""
@@ -53,6 +60,155 @@ class Stats(commands.Cog):
                                   datefmt="[%d/%m/%Y %H:%M:%S]"))
             self.logger.addHandler(handler)
 
+        # Guild ID -> member ID -> channel ID -> messages not yet saved to config.
+        self.pendingCounts: DefaultDict[int, DefaultDict[int, DefaultDict[str, int]]] = \
+            defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        # Channel ID -> timestamp of the last counted message, for channels that have
+        # been crawled. Live messages are only counted in these channels.
+        self.checkpoints: Dict[int, float] = {}
+        # Channel IDs with checkpoints not yet saved to config.
+        self.pendingCheckpoints: Set[int] = set()
+        # Channel IDs being crawled by an update right now.
+        self.crawlingChannels: Set[int] = set()
+        # Channel ID -> (timestamp, author ID or None if not counted) of live messages
+        # sent while the channel is being crawled.
+        self.crawlBuffers: DefaultDict[int, List[Tuple[float, Optional[int]]]] = \
+            defaultdict(list)
+        self.checkpointsLoaded = asyncio.Event()
+        self.flushLock = asyncio.Lock()
+        # Guild ID -> lock held while an update runs on the guild.
+        self.updateLocks: DefaultDict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.flushTask = self.bot.loop.create_task(self.flushLoop())
+
+    async def cog_unload(self):
+        self.flushTask.cancel()
+        await self.flushMessageCounts()
+
+    async def flushLoop(self):
+        """Load channel checkpoints, then periodically save live message counts."""
+        allChannels = await self.config.all_channels()
+        for chanId, chanData in allChannels.items():
+            if chanData.get("lastUpdated"):
+                self.checkpoints.setdefault(chanId, chanData["lastUpdated"])
+        self.checkpointsLoaded.set()
+
+        while True:
+            await asyncio.sleep(FLUSH_TIME)
+            try:
+                await self.flushMessageCounts()
+            except Exception:  # pylint: disable=broad-except
+                self.logger.error("Could not save message counts", exc_info=True)
+
+    async def addMessageCounts(self, guildId: int,
+                               memberCounts: Dict[int, Dict[str, int]]):
+        """Add message counts to the members of a guild in config.
+
+        Parameters:
+        -----------
+        guildId: int
+            The guild ID.
+        memberCounts: Dict[int, Dict[str, int]]
+            Member ID -> channel ID -> number of messages to add.
+        """
+        membersLock = self.config.get_members_lock(discord.Object(id=guildId))
+        async with membersLock:
+            for memberId, chanCounts in memberCounts.items():
+                memberConfig = self.config.member_from_ids(guildId, memberId)
+                async with memberConfig.messageCount() as msgCount:
+                    for chanId, count in chanCounts.items():
+                        msgCount[chanId] = msgCount.get(chanId, 0) + count
+
+    async def flushMessageCounts(self):
+        """Save live message counts and channel checkpoints to config."""
+        async with self.flushLock:
+            # Take the checkpoints at the same time as the counts, so that they only
+            # cover messages in the counts being saved.
+            pendingCounts, self.pendingCounts = self.pendingCounts, defaultdict(
+                lambda: defaultdict(lambda: defaultdict(int)))
+            pendingCheckpoints = {chanId: self.checkpoints[chanId]
+                                  for chanId in self.pendingCheckpoints}
+            self.pendingCheckpoints = set()
+
+            for guildId, memberCounts in pendingCounts.items():
+                await self.addMessageCounts(guildId, memberCounts)
+            # Checkpoints are saved after the counts, so that a message is never skipped.
+            for chanId, checkpoint in pendingCheckpoints.items():
+                await self.config.channel_from_id(chanId).lastUpdated.set(checkpoint)
+
+    async def crawlChannel(self, chan: discord.TextChannel):
+        """Count the messages in a channel since its checkpoint.
+
+        Counts are kept in memory, and saved along with the checkpoint after every
+        page of `PAGE_SIZE` messages, so an interrupted crawl resumes from there.
+
+        The channel must already be in `crawlingChannels`, and its live counts saved,
+        so that messages are not counted by both the crawl and the listener.
+        """
+        self.logger.debug("Processing channel %s (%s)", chan.name, chan.id)
+        completed = False
+        try:
+            lastUpdated = await self.config.channel(chan).lastUpdated()
+            after = datetime.fromtimestamp(lastUpdated) if lastUpdated else None
+            pageCounts: DefaultDict[int, int] = defaultdict(int)
+            pageSize = 0
+            checkpoint = lastUpdated
+
+            async def savePage():
+                if pageCounts:
+                    await self.addMessageCounts(
+                        chan.guild.id,
+                        {memberId: {str(chan.id): count}
+                         for memberId, count in pageCounts.items()})
+                if checkpoint:
+                    await self.config.channel(chan).lastUpdated.set(checkpoint)
+                    self.checkpoints[chan.id] = checkpoint
+                pageCounts.clear()
+
+            try:
+                async for msg in chan.history(limit=None, after=after, oldest_first=True):
+                    checkpoint = msg.created_at.timestamp()
+                    pageSize += 1
+                    if not msg.author.bot and isinstance(msg.author, discord.Member):
+                        pageCounts[msg.author.id] += 1
+                    if pageSize >= PAGE_SIZE:
+                        await savePage()
+                        pageSize = 0
+            except discord.Forbidden:
+                self.logger.error("Permission error! Check traceback", exc_info=True)
+            else:
+                completed = True
+            await savePage()
+            if completed:
+                self.countBufferedMessages(chan, checkpoint)
+        finally:
+            if not completed:
+                # Leave the channel to the next update, which starts from the saved
+                # checkpoint, instead of counting live messages after a gap.
+                self.checkpoints.pop(chan.id, None)
+                self.pendingCheckpoints.discard(chan.id)
+            self.crawlBuffers.pop(chan.id, None)
+            self.crawlingChannels.discard(chan.id)
+
+    def countBufferedMessages(self, chan: discord.TextChannel, checkpoint: Optional[float]):
+        """Count the live messages sent during a crawl, and hand the channel back to the
+        listener.
+
+        Only messages after the last crawled message are counted, since the crawl
+        already counted the ones before it.
+        """
+        newCheckpoint = checkpoint
+        for timestamp, authorId in self.crawlBuffers.pop(chan.id, []):
+            if checkpoint is not None and timestamp <= checkpoint:
+                continue
+            if authorId:
+                self.pendingCounts[chan.guild.id][authorId][str(chan.id)] += 1
+            newCheckpoint = timestamp if newCheckpoint is None else max(newCheckpoint, timestamp)
+        if newCheckpoint is None:
+            # empty channel, count everything from now on
+            newCheckpoint = datetime.now().timestamp()
+        self.checkpoints[chan.id] = newCheckpoint
+        self.pendingCheckpoints.add(chan.id)
+
 
     @commands.group(name="stats")
     @commands.guild_only()
@@ -66,39 +222,47 @@ class Stats(commands.Cog):
 
         This operation may take a long time.
         """
+        updateLock = self.updateLocks[ctx.guild.id]
+        if updateLock.locked():
+            await ctx.send(":negative_squared_cross_mark: An update is already running "
+                           "on this server!")
+            return
+
+        async with updateLock:
+            await self.updateGuild(ctx)
+
+    async def updateGuild(self, ctx: Context):
+        """Crawl the text channels of the guild, and report progress in the channel."""
         self.logger.debug("Starting stats update on guild %s (%s)",
                           ctx.guild.name, ctx.guild.id)
         status = await ctx.send(":information_source: Updating, please wait...")
-        membersLock = self.config.get_members_lock(ctx.guild)
-        channelsLock = self.config.get_channels_lock()
+        channels = [chan for chan in ctx.guild.text_channels
+                    if chan.id not in self.crawlingChannels]
+        # Stop counting live messages in these channels, and save the ones counted so
+        # far, so that the crawl starts from where the listener left off.
+        self.crawlingChannels.update(chan.id for chan in channels)
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHANNELS)
+        done = 0
 
-        # TODO double check to make sure that we can't deadlock here.
-        await membersLock.acquire()
-        await channelsLock.acquire()
+        async def crawl(chan: discord.TextChannel):
+            nonlocal done
+            async with semaphore:
+                await self.crawlChannel(chan)
+            done += 1
+            await status.edit(content=":information_source: Processed **{}/{}** "
+                              "channels".format(done, len(channels)))
 
-        self.logger.debug("Member and channel locks acquired")
-
-        for chan in ctx.guild.text_channels:
-            self.logger.debug("Processing channel %s (%s)", chan.name, chan.id)
-            await status.edit(content=":information_source: Processing channel **{}"
-                              "**".format(chan.name))
-            lastUpdated = await self.config.channel(chan).lastUpdated()
-            lastUpdated = datetime.fromtimestamp(lastUpdated) if lastUpdated else None
-            try:
-                async for msg in chan.history(limit=None, after=lastUpdated,
-                        oldest_first=True):
-                    self.logger.debug("Current message: %s", msg)
-                    await self.config.channel(chan).lastUpdated.set(msg.created_at.
-                            timestamp())
-                    if msg.author.bot or not isinstance(msg.author, discord.Member):
-                        continue
-                    async with self.config.member(msg.author).messageCount() as msgCount:
-                        if str(chan.id) not in msgCount.keys():
-                            msgCount[str(chan.id)] = 1
-                        else:
-                            msgCount[str(chan.id)] += 1
-            except discord.Forbidden:
-                self.logger.error("Permission error! Check traceback", exc_info=True)
+        try:
+            await self.flushMessageCounts()
+            await asyncio.gather(*(crawl(chan) for chan in channels))
+        finally:
+            for chan in channels:
+                if chan.id in self.crawlingChannels:
+                    # never crawled, leave it to the next update
+                    self.checkpoints.pop(chan.id, None)
+                    self.pendingCheckpoints.discard(chan.id)
+                    self.crawlBuffers.pop(chan.id, None)
+                    self.crawlingChannels.discard(chan.id)
 
         await status.edit(content=":white_check_mark: Stats update complete!")
 
@@ -119,9 +283,34 @@ class Stats(commands.Cog):
 
         for chanId, msgs in memberData.items():
             total += msgs
+        # include live messages not saved to config yet
+        pendingCounts = self.pendingCounts.get(ctx.guild.id, {}).get(member.id, {})
+        for chanId, msgs in pendingCounts.items():
+            total += msgs
         await ctx.send("You have sent {} messages on this server!".format(total))
 
     @commands.Cog.listener("on_message")
     async def messageListener(self, message: discord.Message):
-        """Check each message and update the info for the guild member."""
-        pass
+        """Check each message and update the info for the guild member.
+
+        Messages are counted in memory, and saved to config by `flushLoop`.
+        """
+        if not message.guild or not self.checkpointsLoaded.is_set():
+            return
+        chanId = message.channel.id
+        counted = not message.author.bot and isinstance(message.author, discord.Member)
+        if chanId in self.crawlingChannels:
+            # counted once the crawl is done, if the crawl did not already see it
+            self.crawlBuffers[chanId].append(
+                (message.created_at.timestamp(), message.author.id if counted else None))
+            return
+        # Messages in channels that were never crawled will be counted by the next
+        # update instead.
+        if chanId not in self.checkpoints:
+            return
+        self.checkpoints[chanId] = max(self.checkpoints[chanId],
+                                       message.created_at.timestamp())
+        self.pendingCheckpoints.add(chanId)
+        if not counted:
+            return
+        self.pendingCounts[message.guild.id][message.author.id][str(chanId)] += 1
@@ -18,6 +18,7 @@ class Config:
         self.directory = pathlib.Path(directory)
         self.object_hook = options.pop("object_hook", None)
         self.encoder = options.pop("encoder", None)
+        self.on_load = options.pop("on_load", None)
         self.loop = options.pop("loop", asyncio.get_event_loop())
         self.lock = asyncio.Lock()
         if options.pop("load_later", False):
@@ -31,6 +32,8 @@ class Config:
                 self._db = json.load(f, object_hook=self.object_hook)
         except FileNotFoundError:
             self._db = {}
+        if self.on_load:
+            self.on_load(self._db)
 
     async def load(self):
         async with self.lock:
@@ -7,6 +7,9 @@ BASE_GUILD = {KEY_DM: False, KEY_TIERS: {}, KEY_USE_ALIAS: False}
 
 DUMP_IN = "data/tags/tags.json"
 DUMP_OUT = "data/tags/export.csv"
+EXPORT_FILENAME = "tags-{}.ndjson.gz"
+IMPORT_FILENAME = "import.ndjson.gz"
+IMPORT_CHUNK_SIZE = 500  # Number of tags to read from an import file at a time
 
 NO_LIMIT = float("inf")
 MAX_MSG_LEN = 2000
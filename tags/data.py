@@ -1,3 +1,4 @@
+from collections import defaultdict
 import datetime
 import json
 
@@ -89,3 +90,60 @@ class TagEncoder(json.JSONEncoder):
             payload["__tag_alias__"] = True
             return payload
         return json.JSONEncoder.default(self, obj)
+
+
+class TagOwnerIndex:
+    """An index of tag keys by owner, for each tag location.
+
+    This mirrors the tag database so that looking up the tags a member owns
+    only touches that member's tags, instead of every tag in the location.
+    Owner IDs are normalized to strings, as they are in the database.
+    """
+
+    __slots__ = ("_index",)
+
+    def __init__(self):
+        self._index = defaultdict(lambda: defaultdict(set))
+
+    def rebuild(self, db):
+        """Rebuild the index from a tag database.
+
+        Parameters
+        ----------
+        db: dict
+            A mapping of location to a mapping of tag keys to tags.
+        """
+        index = defaultdict(lambda: defaultdict(set))
+        for location, tags in db.items():
+            for key, tag in tags.items():
+                index[location][str(tag.owner_id)].add(key)
+        self._index = index
+
+    def add(self, location, key, owner_id):
+        """Record that the tag stored at `key` in `location` belongs to `owner_id`."""
+        self._index[location][str(owner_id)].add(key)
+
+    def remove(self, location, key, owner_id):
+        """Forget that the tag stored at `key` in `location` belongs to `owner_id`."""
+        owners = self._index.get(location)
+        if owners is None:
+            return
+        keys = owners.get(str(owner_id))
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del owners[str(owner_id)]
+
+    def get(self, location, owner_id):
+        """Get the keys of all tags in `location` that belong to `owner_id`.
+
+        Returns
+        -------
+        frozenset
+            The tag keys, which may be empty.
+        """
+        owners = self._index.get(location)
+        if owners is None:
+            return frozenset()
+        return frozenset(owners.get(str(owner_id), ()))
@@ -1,7 +1,9 @@
-from typing import List
+import gzip
+import json
+from typing import Iterable, Iterator, List, Tuple, Union
 
 from .constants import COLOUR_BLURPLE, MAX_MSG_LEN
-from .data import TagAlias, TagInfo
+from .data import TagAlias, TagEncoder, TagInfo
 
 import discord
 from redbot.core.utils import AsyncIter, chat_formatting
@@ -77,3 +79,71 @@ def tagDecoder(obj):
     if "__tag_alias__" in obj:
         return TagAlias(**obj)
     return obj
+
+
+def writeTagsExport(path: str, tags: Iterable[Tuple[str, Union[TagInfo, TagAlias]]]) -> int:
+    """Write tags to a gzipped NDJSON file, one tag per line.
+
+    Each tag is encoded and written as it is consumed, so the export is never
+    held in memory as a whole. This is blocking, and should be run in an executor.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file to write to.
+    tags: Iterable[ Tuple[ str, Union[ TagInfo, TagAlias ] ] ]
+        Pairs of tag keys and tags to export.
+
+    Returns
+    -------
+    int
+        The number of tags written.
+    """
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as fp:
+        for key, tag in tags:
+            fp.write(
+                json.dumps(
+                    {"key": key, "tag": tag},
+                    ensure_ascii=True,
+                    cls=TagEncoder,
+                    separators=(",", ":"),
+                )
+            )
+            fp.write("\n")
+            count += 1
+    return count
+
+
+def readTagsExport(path: str) -> Iterator[Tuple[str, Union[TagInfo, TagAlias]]]:
+    """Read tags from a gzipped NDJSON file written by `writeTagsExport`.
+
+    This is blocking, and should be run in an executor.
+
+    Parameters
+    ----------
+    path: str
+        The path of the file to read from.
+
+    Yields
+    ------
+    Tuple[ str, Union[ TagInfo, TagAlias ] ]
+        Pairs of tag keys and tags, in the order they were exported.
+
+    Raises
+    ------
+    ValueError
+        A line in the file is not a valid tag entry.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        for lineNum, line in enumerate(fp, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line, object_hook=tagDecoder)
+            if (
+                not isinstance(entry, dict)
+                or not isinstance(entry.get("key"), str)
+                or not isinstance(entry.get("tag"), (TagInfo, TagAlias))
+            ):
+                raise ValueError(f"Line {lineNum} is not a valid tag entry.")
+            yield entry["key"], entry["tag"]
@@ -5,9 +5,15 @@
 
 from .config import Config
 from .constants import *
-from .data import TagAlias, TagEncoder, TagInfo
+from .data import TagAlias, TagEncoder, TagInfo, TagOwnerIndex
 from .exceptions import *
-from .helpers import checkLengthInRaw, createSimplePages, tagDecoder
+from .helpers import (
+    checkLengthInRaw,
+    createSimplePages,
+    readTagsExport,
+    tagDecoder,
+    writeTagsExport,
+)
 from .rolecheck import roles_or_mod_or_permissions
 
 from collections import defaultdict
@@ -15,8 +21,10 @@ from copy import deepcopy
 import csv
 import datetime
 import difflib
+from itertools import islice
 import json
 import logging
+import tempfile
 from threading import Lock
 
 import asyncio
@@ -59,11 +67,13 @@ class Tags(commands.Cog):
                 empty = dict()
                 json.dump(empty, f)
 
+        self.ownerIndex = TagOwnerIndex()
         self.config = Config(
             str(saveFolder),
             "tags.json",
             encoder=TagEncoder,
             object_hook=tagDecoder,
+            on_load=self.ownerIndex.rebuild,
             loop=bot.loop,
             load_later=True,
         )
@@ -180,17 +190,9 @@ class Tags(commands.Cog):
             if list(set(admin_roles) & set(roles)) or list(set(mod_roles) & set(roles)):
                 return (False, NO_LIMIT)
 
-        tags = [
-            tag.name
-            for tag in self.config.get("generic", {}).values()
-            if tag.owner_id == str(user.id)
-        ]
+        numTags = len(self.ownerIndex.get("generic", user.id))
         if server:
-            tags.extend(
-                tag.name
-                for tag in self.config.get(str(server.id), {}).values()
-                if tag.owner_id == str(user.id)
-            )
+            numTags += len(self.ownerIndex.get(str(server.id), user.id))
         tiers = await self.configV3.guild(server).get_attr(KEY_TIERS)()
         # Convert role IDs to string since keys are stored as strings.
         roleIds = [str(r.id) for r in user.roles]
@@ -198,7 +200,7 @@ class Tags(commands.Cog):
         if not relevantTiers:
             return (True, 0)
         limit = max([tiers[key] for key in relevantTiers])
-        if len(tags) >= limit:
+        if numTags >= limit:
             return (True, limit)
         return (False, limit)
 
@@ -397,6 +399,128 @@ class Tags(commands.Cog):
 
             await ctx.send(file=discord.File(DUMP_OUT))
 
+    @settings.command(name="export")
+    async def export(self, ctx: Context):
+        """Export server-specific tags to a file.
+
+        The file is a gzipped NDJSON file with one tag per line, which can be
+        loaded on another bot with `[p]tag settings import`.
+        """
+        location = str(ctx.guild.id)
+        tags = list(self.config.get(location, {}).items())
+        if not tags:
+            await ctx.send("There are no tags on this server!")
+            return
+
+        filename = EXPORT_FILENAME.format(location)
+        with tempfile.TemporaryDirectory() as tempDir:
+            path = pathJoin(tempDir, filename)
+            count = await self.bot.loop.run_in_executor(None, writeTagsExport, path, tags)
+            await ctx.send(
+                f"Exported {count} tags from this server.",
+                file=discord.File(path, filename=filename),
+            )
+
+    @settings.command(name="import")
+    async def importTags(self, ctx: Context):
+        """Import server-specific tags from a file.
+
+        Attach a file created by `[p]tag settings export` to the command message.
+        Tags with names that already exist on this server are skipped, as are tags
+        that could not be created with `[p]tag add` or `[p]tag alias`. If the file is
+        not valid, no tags are imported.
+        """
+        if not ctx.message.attachments:
+            await ctx.send("Please attach a tag export file to your message.")
+            return
+
+        try:
+            aliasCog = await self.checkAliasCog(ctx)
+        except RuntimeError as error:
+            await ctx.send(error)
+            return
+
+        location = str(ctx.guild.id)
+        db = self.config.get(location, {})
+        newTags = {}
+        existing = 0
+        invalid = 0
+
+        attachment = ctx.message.attachments[0]
+        with tempfile.TemporaryDirectory() as tempDir:
+            path = pathJoin(tempDir, IMPORT_FILENAME)
+            await attachment.save(path)
+            reader = readTagsExport(path)
+            try:
+                while True:
+                    chunk = await self.bot.loop.run_in_executor(
+                        None, lambda: list(islice(reader, IMPORT_CHUNK_SIZE))
+                    )
+                    if not chunk:
+                        break
+                    for key, tag in chunk:
+                        if key in db or key in newTags:
+                            existing += 1
+                        elif self.isValidImportedTag(key, tag, aliasCog):
+                            newTags[key] = tag
+                        else:
+                            invalid += 1
+            except (OSError, EOFError, KeyError, TypeError, ValueError) as error:
+                self.logger.error(
+                    "Could not import tags from %s", attachment.filename, exc_info=True
+                )
+                await ctx.send(f"Could not read the tag export file: {error}")
+                return
+            finally:
+                reader.close()
+
+        # aliases may point to tags later in the file, so they are checked last
+        possibleTags = self.get_possible_tags(ctx.guild)
+        for key, tag in list(newTags.items()):
+            if isinstance(tag, TagAlias):
+                original = newTags.get(tag.original, possibleTags.get(tag.original))
+                if not isinstance(original, TagInfo):
+                    del newTags[key]
+                    invalid += 1
+
+        for key, tag in newTags.items():
+            if isinstance(tag, TagInfo):
+                tag.location = location
+            db[key] = tag
+            self.ownerIndex.add(location, key, tag.owner_id)
+
+        if newTags:
+            await self.config.put(location, db)
+        if aliasCog:
+            # Alias is already loaded.
+            for key in newTags:
+                await aliasCog.add_alias(ctx, key, "tag {}".format(key))
+        await ctx.send(
+            f"Imported {len(newTags)} tags. {existing} tags already existed and "
+            f"{invalid} tags were not valid, and were skipped."
+        )
+
+    def isValidImportedTag(self, key: str, tag, aliasCog) -> bool:
+        """Check whether an imported tag could have been created with the tag commands.
+
+        Alias targets are not checked here, since they may be later in the file.
+        """
+        if key != key.lower().strip():
+            return False
+        try:
+            self.verify_lookup(key)
+            self.checkValidCommandName(key)
+        except RuntimeError:
+            return False
+        if aliasCog and aliasCog.is_command(key):
+            return False
+        if isinstance(tag, TagInfo):
+            if not isinstance(tag.content, str):
+                return False
+            tag.content = self.clean_tag_content(tag.content)
+            return checkLengthInRaw(tag.content)
+        return isinstance(tag.original, str)
+
     @tag.command(name="add", aliases=["create"])
     @commands.guild_only()
     @roles_or_mod_or_permissions(allowed_roles=allowed_roles, manage_messages=True)
@@ -445,6 +569,7 @@ class Tags(commands.Cog):
             location=location,
             created_at=datetime.datetime.utcnow().timestamp(),
         )
+        self.ownerIndex.add(location, lookup, ctx.message.author.id)
 
         await self.config.put(location, db)
         await ctx.send('Tag "{}" successfully created.'.format(name))
@@ -500,6 +625,7 @@ class Tags(commands.Cog):
             location="generic",
             created_at=datetime.datetime.utcnow().timestamp(),
         )
+        self.ownerIndex.add("generic", lookup, ctx.author.id)
         await self.config.put("generic", db)
         await ctx.send('Tag "{}" successfully created.'.format(name))
 
@@ -565,6 +691,7 @@ class Tags(commands.Cog):
             owner_id=str(ctx.author.id),
             created_at=datetime.datetime.utcnow().timestamp(),
         )
+        self.ownerIndex.add(str(server.id), lookup, ctx.author.id)
 
         await self.config.put(str(server.id), db)
         await ctx.send(
@@ -665,10 +792,11 @@ class Tags(commands.Cog):
         db[lookup] = TagInfo(
             name.content,
             content,
-            name.author.id,
+            str(name.author.id),
             location=location,
             created_at=datetime.datetime.utcnow().timestamp(),
         )
+        self.ownerIndex.add(location, lookup, name.author.id)
         await self.config.put(location, db)
         await ctx.send("Cool. I've made your {0.content} tag.".format(name))
 
@@ -838,9 +966,12 @@ class Tags(commands.Cog):
 
         if response.content.lower() == "yes":
             # The user has answered yes; transfering tag
-            db = self.config.get(tag.location)
+            location = str(server.id) if isinstance(tag, TagAlias) else tag.location
+            db = self.config.get(location)
+            self.ownerIndex.remove(location, lookup, tag.owner_id)
             tag.owner_id = str(user.id)
-            await self.config.put(tag.location, db)
+            self.ownerIndex.add(location, lookup, tag.owner_id)
+            await self.config.put(location, db)
             await ctx.send(
                 "Tag successfully transferred from the current owner "
                 "to {}.".format(user.mention)
@@ -900,6 +1031,8 @@ class Tags(commands.Cog):
         db[newName] = deepcopy(db[oldName])
         db[newName].name = newName
         del db[oldName]
+        self.ownerIndex.remove(location, oldName, tag.owner_id)
+        self.ownerIndex.add(location, newName, tag.owner_id)
 
         await self.config.put(location, db)
         if await self.configV3.guild(ctx.guild).get_attr(KEY_USE_ALIAS)():
@@ -949,6 +1082,7 @@ class Tags(commands.Cog):
             location = str(server.id)
             db = self.config.get(location)
             del db[lookup]
+            self.ownerIndex.remove(location, lookup, tag.owner_id)
             msg = "Tag alias successfully removed."
         else:
             location = tag.location
@@ -958,14 +1092,16 @@ class Tags(commands.Cog):
             if server is not None:
                 alias_db = self.config.get(str(server.id))
                 aliases = [
-                    key
+                    (key, t.owner_id)
                     for key, t in alias_db.items()
                     if isinstance(t, TagAlias) and t.original == lookup
                 ]
-                for alias in aliases:
+                for alias, aliasOwnerId in aliases:
                     alias_db.pop(alias, None)
+                    self.ownerIndex.remove(str(server.id), alias, aliasOwnerId)
 
             del db[lookup]
+            self.ownerIndex.remove(location, lookup, tag.owner_id)
 
         await self.config.put(location, db)
         await ctx.send(msg)
@@ -1025,17 +1161,11 @@ class Tags(commands.Cog):
         """
         owner = ctx.message.author if member is None else member
         server = ctx.message.guild
-        tags = [
-            tag.name
-            for tag in self.config.get("generic", {}).values()
-            if tag.owner_id == str(owner.id)
-        ]
+        generic = self.config.get("generic", {})
+        tags = [generic[key].name for key in self.ownerIndex.get("generic", owner.id)]
         if server is not None:
-            tags.extend(
-                tag.name
-                for tag in self.config.get(str(server.id), {}).values()
-                if tag.owner_id == str(owner.id)
-            )
+            db = self.config.get(str(server.id), {})
+            tags.extend(db[key].name for key in self.ownerIndex.get(str(server.id), owner.id))
 
         tags.sort()
 
@@ -1069,8 +1199,9 @@ class Tags(commands.Cog):
         """Removes all server-specific tags by a user.
         You must have Manage Messages permissions to use this.
         """
-        db = self.config.get(str(ctx.message.guild.id), {})
-        tags = [key for key, tag in db.items() if tag.owner_id == str(member.id)]
+        location = str(ctx.message.guild.id)
+        db = self.config.get(location, {})
+        tags = list(self.ownerIndex.get(location, member.id))
 
         # TODO I'm pretty sure there's a decorator for the following.
         if not ctx.message.channel.permissions_for(ctx.message.guild.me).add_reactions:
@@ -1123,8 +1254,9 @@ class Tags(commands.Cog):
 
         for key in tags:
             db.pop(key)
+            self.ownerIndex.remove(location, key, member.id)
 
-        await self.config.put(str(ctx.message.guild.id), db)
+        await self.config.put(location, db)
         await msg.delete()
         await ctx.send(
             "Successfully removed all {} tags that belong to {}".format(
@@ -0,0 +1,51 @@
+from .data import TagAlias, TagInfo, TagOwnerIndex
+
+
+class TestTagOwnerIndex:
+    """Tests to ensure TagOwnerIndex mirrors tag ownership as expected."""
+
+    def makeDb(self):
+        return {
+            "generic": {
+                "hello": TagInfo("hello", "world", "1", location="generic"),
+            },
+            "1234": {
+                "foo": TagInfo("foo", "bar", "1", location="1234"),
+                "baz": TagInfo("baz", "qux", "2", location="1234"),
+                "bar": TagAlias(name="bar", original="foo", owner_id="1"),
+            },
+        }
+
+    def testRebuild(self):
+        index = TagOwnerIndex()
+        index.rebuild(self.makeDb())
+
+        assert index.get("generic", 1) == {"hello"}
+        assert index.get("1234", "1") == {"foo", "bar"}
+        assert index.get("1234", 2) == {"baz"}
+        assert index.get("1234", 3) == set()
+        assert index.get("5678", 1) == set()
+
+    def testAddAndRemove(self):
+        index = TagOwnerIndex()
+        index.add("1234", "foo", 1)
+        index.add("1234", "bar", "1")
+        assert index.get("1234", 1) == {"foo", "bar"}
+
+        index.remove("1234", "foo", "1")
+        assert index.get("1234", 1) == {"bar"}
+
+        # Removing unknown entries is a no-op.
+        index.remove("1234", "foo", 1)
+        index.remove("1234", "foo", 2)
+        index.remove("5678", "foo", 1)
+
+        index.remove("1234", "bar", 1)
+        assert index.get("1234", 1) == set()
+
+    def testGetReturnsSnapshot(self):
+        index = TagOwnerIndex()
+        index.add("1234", "foo", 1)
+        keys = index.get("1234", 1)
+        index.remove("1234", "foo", 1)
+        assert keys == {"foo"}
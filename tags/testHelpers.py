@@ -1,9 +1,11 @@
+import gzip
 import random
 import typing
 
 import pytest
 
 from . import constants, helpers
+from .data import TagAlias, TagInfo
 
 
 class Utils:
@@ -196,3 +198,52 @@ class TestCheckLengthInRaw:
     )
     def testBadCases(self, content: str):
         assert not helpers.checkLengthInRaw(content)
+
+
+class TestTagsExport:
+    """Tests to ensure helpers writeTagsExport() and readTagsExport() work as expected."""
+
+    def testRoundTrip(self, tmp_path):
+        path = str(tmp_path / "export.ndjson.gz")
+        tags = [
+            ("foo", TagInfo("Foo", "bar", "1", location="1234", uses=3, created_at=1.0)),
+            ("baz", TagAlias(name="baz", original="foo", owner_id="2", created_at=2.0)),
+        ]
+
+        assert helpers.writeTagsExport(path, tags) == 2
+        result = list(helpers.readTagsExport(path))
+
+        assert [key for key, _ in result] == ["foo", "baz"]
+        foo, baz = result[0][1], result[1][1]
+        assert isinstance(foo, TagInfo)
+        assert (foo.name, foo.content, foo.owner_id, foo.uses, foo.location, foo.created_at) == (
+            "Foo",
+            "bar",
+            "1",
+            3,
+            "1234",
+            1.0,
+        )
+        assert isinstance(baz, TagAlias)
+        assert (baz.name, baz.original, baz.owner_id) == ("baz", "foo", "2")
+
+    def testEmptyExport(self, tmp_path):
+        path = str(tmp_path / "export.ndjson.gz")
+        assert helpers.writeTagsExport(path, []) == 0
+        assert list(helpers.readTagsExport(path)) == []
+
+    @pytest.mark.parametrize(
+        ["line"],
+        [
+            ['{"key":"foo"}'],
+            ['{"key":1,"tag":{"name":"a","original":"b","owner_id":"1","__tag_alias__":true}}'],
+            ['["not", "a", "tag"]'],
+        ],
+    )
+    def testBadEntries(self, tmp_path, line):
+        path = str(tmp_path / "export.ndjson.gz")
+        with gzip.open(path, "wt", encoding="utf-8") as fp:
+            fp.write(line + "\n")
+
+        with pytest.raises(ValueError):
+            list(helpers.readTagsExport(path))
@@ -43,7 +43,7 @@ PERMS_READ_Y = PermissionOverwrite(read_messages=True, add_reactions=True)
 PERMS_READ_N = PermissionOverwrite(read_messages=False, add_reactions=False)
 PERMS_SEND_N = PermissionOverwrite(send_messages=False, add_reactions=False)
 
-SLEEP_TIME = 15  # Background loop sleep time in seconds
+MAX_CONCURRENT_GUILDS = 5  # Max number of guilds to create/delete channels for at once
 
 
 DEFAULT_GUILD = {
@@ -3,7 +3,8 @@
 Creates a temporary channel.
 """
 from copy import deepcopy
-from datetime import datetime
+from datetime import datetime, timedelta
+import heapq
 import logging
 import os
 import time
@@ -35,11 +36,24 @@ class TempChannels(commands.Cog):
             )
             self.logger.addHandler(handler)
 
+        # Guild ID -> the POSIX timestamp of its next create/delete check.
+        self.deadlines = {}
+        # Heap of (deadline, guild ID), possibly with stale entries.
+        self.deadlineHeap = []
+        # Guild ID -> the start time the channel was last created for.
+        self.lastStarted = {}
+        self.wakeEvent = asyncio.Event()
+        self.guildSemaphore = asyncio.Semaphore(MAX_CONCURRENT_GUILDS)
+        # Guild ID -> task creating/deleting the channel for that guild.
+        self.guildTasks = {}
+
         self.bgTask = self.bot.loop.create_task(self.checkChannels())
 
     # Cancel the background task on cog unload.
     def __unload(self):  # pylint: disable=invalid-name
         self.bgTask.cancel()
+        for task in self.guildTasks.values():
+            task.cancel()
 
     def cog_unload(self):
         self.__unload()
@@ -153,6 +167,7 @@ class TempChannels(commands.Cog):
             )
             await ctx.send(":white_check_mark: TempChannel: Enabled.")
         await guildConfig.get_attr(KEY_ENABLED).set(enabled)
+        await self.planGuild(ctx.guild)
 
     @tempChannels.command(name="nsfw")
     async def tempChannelsNSFW(self, ctx: Context):
@@ -209,6 +224,7 @@ class TempChannels(commands.Cog):
         guildConfig = self.config.guild(ctx.guild)
         await guildConfig.get_attr(KEY_START_HOUR).set(hour)
         await guildConfig.get_attr(KEY_START_MIN).set(minute)
+        await self.planGuild(ctx.guild)
 
         self.logger.info(
             "%s (%s) set the start time to %002d:%002d on %s (%s)",
@@ -558,6 +574,7 @@ class TempChannels(commands.Cog):
             else:
                 await guildConfig.get_attr(KEY_CH_ID).set(None)
                 await guildConfig.get_attr(KEY_CH_CREATED).set(False)
+                await self.planGuild(ctx.guild)
                 self.logger.info(
                     "%s (%s) deleted the temp channel #%s (%s) in %s (%s).",
                     ctx.author.name,
@@ -577,138 +594,265 @@ class TempChannels(commands.Cog):
     ###################
     # Background Loop #
     ###################
-    async def checkChannels(self):  # pylint: disable=too-many-branches,too-many-statements
+    def nextStartTime(self, guildId: int, hour: int, minute: int) -> float:
+        """Get the next time the temp channel should be created.
+
+        If it is currently the start minute, and the channel has not been created
+        for it yet, then the start of the current minute is returned, so that a late
+        wakeup does not skip a day.
+
+        Parameters:
+        -----------
+        guildId: int
+            The guild ID to get the start time for.
+        hour: int
+            The hour the temporary channel is started at, in local time.
+        minute: int
+            The minute the temporary channel is started at, in local time.
+
+        Returns:
+        --------
+        float
+            The POSIX timestamp of the next start time.
+        """
+        now = datetime.now()
+        startTime = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if now >= startTime + timedelta(minutes=1):
+            startTime += timedelta(days=1)
+        if startTime.timestamp() == self.lastStarted.get(guildId):
+            startTime += timedelta(days=1)
+        return startTime.timestamp()
+
+    async def planGuild(self, guild: discord.Guild, guildData: dict = None):
+        """Compute the next create/delete deadline for a guild, and schedule it.
+
+        This should be called whenever settings that affect the schedule change.
+
+        Parameters:
+        -----------
+        guild: discord.Guild
+            The guild to plan.
+        guildData: dict
+            The guild settings. If not passed in, they will be read from config.
+        """
+        if guildData is None:
+            guildData = await self.config.guild(guild).all()
+
+        deadline = None
+        if guildData[KEY_ENABLED]:
+            if guildData[KEY_CH_CREATED]:
+                deadline = guildData.get(KEY_STOP_TIME, 0)
+            elif not guildData[KEY_CH_ID]:
+                deadline = self.nextStartTime(
+                    guild.id, guildData[KEY_START_HOUR], guildData[KEY_START_MIN]
+                )
+
+        if deadline is None:
+            self.deadlines.pop(guild.id, None)
+            self.logger.debug("Nothing scheduled for %s (%s)", guild.name, guild.id)
+        else:
+            # Entries for the guild that are already in the heap become stale, and
+            # are skipped when they are popped.
+            self.deadlines[guild.id] = deadline
+            heapq.heappush(self.deadlineHeap, (deadline, guild.id))
+            self.logger.debug(
+                "Next check for %s (%s) at %s",
+                guild.name,
+                guild.id,
+                datetime.fromtimestamp(deadline),
+            )
+        self.wakeEvent.set()
+
+    async def checkChannels(self):
         """Loop to check whether or not we should create/delete the
-        TempChannel."""
+        TempChannel.
+
+        This sleeps until the earliest guild deadline, or until the schedule changes.
+        """
+        await self.bot.wait_until_ready()
+        for guildId, guildData in (await self.config.all_guilds()).items():
+            guild = self.bot.get_guild(guildId)
+            if guild:
+                await self.planGuild(guild, {**DEFAULT_GUILD, **guildData})
+
         while self == self.bot.get_cog("TempChannels"):
-            await asyncio.sleep(SLEEP_TIME)
-            # Create/maintain the channel during a valid time and duration, else
-            # delete it.
-            for guild in self.bot.guilds:
-                async with self.config.guild(guild).all() as guildData:
-                    try:
-                        if not guildData[KEY_ENABLED]:
-                            continue
-
-                        if (
-                            int(time.strftime("%H")) == guildData[KEY_START_HOUR]
-                            and int(time.strftime("%M")) == guildData[KEY_START_MIN]
-                            and not guildData[KEY_CH_CREATED]
-                            and not guildData[KEY_CH_ID]
-                        ):
-                            # See if ALL of the following is satisfied.
-                            # - It is the starting time.
-                            # - The channel creation flag is not set.
-                            # - The channel ID doesn't exist.
-                            #
-                            # If it is satisfied, let's create a channel, and then
-                            # store the following in the settings:
-                            # - Channel ID.
-                            # - Time to delete channel.
-                            # Start with permissions
-
-                            # Always allow the bot to read.
-                            permsDict = {self.bot.user: PERMS_READ_Y}
-
-                            if guildData[KEY_ROLE_ALLOW]:
-                                # If we have allow roles, automatically deny @everyone the "Read
-                                # Messages" permission.
-                                permsDict[guild.default_role] = PERMS_READ_N
-                                for roleId in guildData[KEY_ROLE_ALLOW]:
-                                    role = discord.utils.get(guild.roles, id=roleId)
-                                    self.logger.debug("Allowed role %s", role)
-                                    if role:
-                                        permsDict[role] = deepcopy(PERMS_READ_Y)
-
-                            # Check for deny permissions.
-                            if guildData[KEY_ROLE_DENY]:
-                                for roleId in guildData[KEY_ROLE_DENY]:
-                                    role = discord.utils.get(guild.roles, id=roleId)
-                                    self.logger.debug("Denied role %s", role)
-                                    if role and role not in permsDict.keys():
-                                        self.logger.debug("Role not in dict, adding")
-                                        permsDict[role] = deepcopy(PERMS_SEND_N)
-                                    elif role:
-                                        self.logger.debug("Updating role")
-                                        permsDict[role].update(send_messages=False)
-
-                            self.logger.debug("Current permission overrides: \n%s", permsDict)
-
-                            # Grab parent category. If not set, this will return None anyways.
-                            category = None
-                            if guildData[KEY_CH_CATEGORY]:
-                                category = discord.utils.get(
-                                    guild.channels, id=guildData[KEY_CH_CATEGORY]
-                                )
-
-                            chanObj = await guild.create_text_channel(
-                                guildData[KEY_CH_NAME],
-                                overwrites=permsDict,
-                                category=category,
-                                position=guildData[KEY_CH_POS],
-                                topic=guildData[KEY_CH_TOPIC],
-                                nsfw=guildData[KEY_NSFW],
+            self.wakeEvent.clear()
+            timeout = None
+            if self.deadlineHeap:
+                timeout = max(self.deadlineHeap[0][0] - time.time(), 0)
+            try:
+                await asyncio.wait_for(self.wakeEvent.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.time()
+            while self.deadlineHeap and self.deadlineHeap[0][0] <= now:
+                deadline, guildId = heapq.heappop(self.deadlineHeap)
+                if self.deadlines.get(guildId) != deadline:
+                    # Stale entry, the guild was re-planned.
+                    continue
+                del self.deadlines[guildId]
+                guild = self.bot.get_guild(guildId)
+                if not guild or guildId in self.guildTasks:
+                    # The running task re-plans the guild when it finishes.
+                    continue
+                self.guildTasks[guildId] = asyncio.create_task(self.runGuild(guild, deadline))
+
+    async def runGuild(self, guild: discord.Guild, deadline: float):
+        """Check a guild that has reached its deadline, and then re-plan it.
+
+        Guilds are run concurrently, up to a limit, so that a slow guild does not
+        delay the others. Errors are logged and do not affect other guilds.
+
+        Parameters:
+        -----------
+        guild: discord.Guild
+            The guild to check.
+        deadline: float
+            The POSIX timestamp of the deadline that was reached.
+        """
+        try:
+            async with self.guildSemaphore:
+                await self.checkGuild(guild, deadline)
+                await self.planGuild(guild)
+        except Exception:  # pylint: disable=broad-except
+            self.logger.error(
+                "Could not check the temp channel for server %s (%s)!",
+                guild.name,
+                guild.id,
+                exc_info=True,
+            )
+        finally:
+            self.guildTasks.pop(guild.id, None)
+
+    async def checkGuild(self, guild: discord.Guild, deadline: float):
+        """Create or delete the TempChannel for a guild that has reached its deadline.
+
+        Parameters:
+        -----------
+        guild: discord.Guild
+            The guild to check.
+        deadline: float
+            The POSIX timestamp of the deadline that was reached.
+        """
+        async with self.config.guild(guild).all() as guildData:
+            try:
+                if not guildData[KEY_ENABLED]:
+                    return
+
+                if not guildData[KEY_CH_CREATED] and not guildData[KEY_CH_ID]:
+                    # See if ALL of the following is satisfied.
+                    # - It is the starting time.
+                    # - The channel creation flag is not set.
+                    # - The channel ID doesn't exist.
+                    #
+                    # If it is satisfied, let's create a channel, and then
+                    # store the following in the settings:
+                    # - Channel ID.
+                    # - Time to delete channel.
+                    # Start with permissions
+                    self.lastStarted[guild.id] = deadline
+
+                    # Always allow the bot to read.
+                    permsDict = {self.bot.user: PERMS_READ_Y}
+
+                    if guildData[KEY_ROLE_ALLOW]:
+                        # If we have allow roles, automatically deny @everyone the "Read
+                        # Messages" permission.
+                        permsDict[guild.default_role] = PERMS_READ_N
+                        for roleId in guildData[KEY_ROLE_ALLOW]:
+                            role = discord.utils.get(guild.roles, id=roleId)
+                            self.logger.debug("Allowed role %s", role)
+                            if role:
+                                permsDict[role] = deepcopy(PERMS_READ_Y)
+
+                    # Check for deny permissions.
+                    if guildData[KEY_ROLE_DENY]:
+                        for roleId in guildData[KEY_ROLE_DENY]:
+                            role = discord.utils.get(guild.roles, id=roleId)
+                            self.logger.debug("Denied role %s", role)
+                            if role and role not in permsDict.keys():
+                                self.logger.debug("Role not in dict, adding")
+                                permsDict[role] = deepcopy(PERMS_SEND_N)
+                            elif role:
+                                self.logger.debug("Updating role")
+                                permsDict[role].update(send_messages=False)
+
+                    self.logger.debug("Current permission overrides: \n%s", permsDict)
+
+                    # Grab parent category. If not set, this will return None anyways.
+                    category = None
+                    if guildData[KEY_CH_CATEGORY]:
+                        category = discord.utils.get(guild.channels, id=guildData[KEY_CH_CATEGORY])
+
+                    chanObj = await guild.create_text_channel(
+                        guildData[KEY_CH_NAME],
+                        overwrites=permsDict,
+                        category=category,
+                        position=guildData[KEY_CH_POS],
+                        topic=guildData[KEY_CH_TOPIC],
+                        nsfw=guildData[KEY_NSFW],
+                    )
+                    self.logger.info(
+                        "Channel #%s (%s) in %s (%s) was created.",
+                        chanObj.name,
+                        chanObj.id,
+                        guild.name,
+                        guild.id,
+                    )
+                    guildData[KEY_CH_ID] = chanObj.id
+
+                    # Set delete times, and save settings.
+                    duration = (
+                        guildData[KEY_DURATION_HOURS] * 60 * 60 + guildData[KEY_DURATION_MINS] * 60
+                    )
+                    guildData[KEY_STOP_TIME] = time.time() + duration
+                    guildData[KEY_CH_CREATED] = True
+
+                elif guildData[KEY_CH_CREATED]:
+                    # Channel created, see when we should delete it.
+                    if time.time() >= guildData[KEY_STOP_TIME]:
+                        self.logger.debug("Past channel stop time, clearing ID and created keys.")
+                        chanObj = guild.get_channel(guildData[KEY_CH_ID])
+                        guildData[KEY_CH_ID] = None
+                        guildData[KEY_CH_CREATED] = False
+
+                        if chanObj and guildData[KEY_ARCHIVE]:
+                            # Revoke all role permissions in a single request, keeping
+                            # member-specific overwrites such as the bot's own.
+                            overwrites = {
+                                target: overwrite
+                                for target, overwrite in chanObj.overwrites.items()
+                                if not isinstance(target, discord.Role)
+                            }
+                            overwrites[guild.default_role] = PERMS_READ_N
+                            currentDate = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+                            await chanObj.edit(
+                                name=f"tc-{currentDate}",
+                                overwrites=overwrites,
+                                reason="Archiving tempchannel",
                             )
                             self.logger.info(
-                                "Channel #%s (%s) in %s (%s) was created.",
+                                "Channel #%s (%s) in %s (%s) was archived.",
                                 chanObj.name,
                                 chanObj.id,
                                 guild.name,
                                 guild.id,
                             )
-                            guildData[KEY_CH_ID] = chanObj.id
+                        elif chanObj and not guildData[KEY_ARCHIVE]:
+                            await chanObj.delete()
 
-                            # Set delete times, and save settings.
-                            duration = (
-                                guildData[KEY_DURATION_HOURS] * 60 * 60
-                                + guildData[KEY_DURATION_MINS] * 60
+                            self.logger.info(
+                                "Channel #%s (%s) in %s (%s) was deleted.",
+                                chanObj.name,
+                                chanObj.id,
+                                guild.name,
+                                guild.id,
                             )
-                            guildData[KEY_STOP_TIME] = time.time() + duration
-                            guildData[KEY_CH_CREATED] = True
-
-                        elif guildData[KEY_CH_CREATED]:
-                            # Channel created, see when we should delete it.
-                            if time.time() >= guildData[KEY_STOP_TIME]:
-                                self.logger.debug(
-                                    "Past channel stop time, clearing ID " "and created keys."
-                                )
-                                chanObj = guild.get_channel(guildData[KEY_CH_ID])
-                                guildData[KEY_CH_ID] = None
-                                guildData[KEY_CH_CREATED] = False
-
-                                if chanObj and guildData[KEY_ARCHIVE]:
-                                    await chanObj.set_permissions(
-                                        guild.default_role, overwrite=PERMS_READ_N
-                                    )
-                                    for role in guild.roles:
-                                        if role == guild.default_role:
-                                            continue
-                                        await chanObj.set_permissions(
-                                            role, overwrite=None, reason="Archiving tempchannel"
-                                        )
-                                    currentDate = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                                    await chanObj.edit(name=f"tc-{currentDate}")
-                                    self.logger.info(
-                                        "Channel #%s (%s) in %s (%s) was archived.",
-                                        chanObj.name,
-                                        chanObj.id,
-                                        guild.name,
-                                        guild.id,
-                                    )
-                                elif chanObj and not guildData[KEY_ARCHIVE]:
-                                    await chanObj.delete()
-
-                                    self.logger.info(
-                                        "Channel #%s (%s) in %s (%s) was deleted.",
-                                        chanObj.name,
-                                        chanObj.id,
-                                        guild.name,
-                                        guild.id,
-                                    )
-                    except Exception:  # pylint: disable=broad-except
-                        self.logger.error(
-                            "Something went terribly wrong for server %s (%s)!",
-                            guild.name,
-                            guild.id,
-                            exc_info=True,
-                        )
+            except Exception:  # pylint: disable=broad-except
+                self.logger.error(
+                    "Something went terribly wrong for server %s (%s)!",
+                    guild.name,
+                    guild.id,
+                    exc_info=True,
+                )
@@ -16,9 +16,19 @@ KEY_DESCRIPTIONS = "descriptions"
 KEY_WELCOME_CHANNEL_SETTINGS = "welcomeChannelSettings"
 KEY_POST_FAILED_DM = "postFailedDm"
 KEY_JOINED_USER_IDS = "joinedUserIds"
+KEY_JOINED_USER_IDS_PACKED = "joinedUserIdsPacked"
 
 MAX_MESSAGE_LENGTH = 2000
 MAX_DESCRIPTION_LENGTH = 500
+# How often to save newly joined user IDs to config, in seconds
+JOINED_USERS_FLUSH_TIME = 60
+# Raid mode is entered when at least RAID_JOIN_THRESHOLD members join within RAID_WINDOW seconds
+RAID_JOIN_THRESHOLD = 10
+RAID_WINDOW = 60
+# How often to post batched join messages during raid mode, in seconds
+RAID_SUMMARY_INTERVAL = 30
+# Delay between welcome DMs queued during raid mode, in seconds
+RAID_DM_INTERVAL = 2
 
 DEFAULT_GUILD = {
     KEY_DM_ENABLED: False,
@@ -37,7 +47,9 @@ DEFAULT_GUILD = {
     KEY_WELCOME_CHANNEL_SETTINGS: {
         KEY_POST_FAILED_DM: False,
     },
+    # Legacy list of joined user IDs, migrated to KEY_JOINED_USER_IDS_PACKED on load
     KEY_JOINED_USER_IDS: [],
+    KEY_JOINED_USER_IDS_PACKED: "",
 }
 
 
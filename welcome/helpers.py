@@ -1,5 +1,9 @@
+import base64
 import discord
-from typing import Dict, List
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List
 
 from redbot.core.utils import AsyncIter
 from redbot.core.utils.chat_formatting import box
@@ -64,3 +68,61 @@ async def createTagListPages(
         pageList.append(embed)
 
     return pageList
+
+
+class UserIdSet:
+    """A compact set of user IDs, kept as a sorted array of 64-bit integers.
+
+    Lookups use binary search, and the whole set can be packed into a short string
+    for storage in config.
+    """
+
+    def __init__(self, userIds: Iterable[int] = ()):
+        self._ids = array("q", sorted(set(userIds)))
+
+    def __contains__(self, userId: int) -> bool:
+        index = bisect_left(self._ids, userId)
+        return index < len(self._ids) and self._ids[index] == userId
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def add(self, userId: int) -> bool:
+        """Add a user ID to the set.
+
+        Returns
+        -------
+        bool
+            True if the user ID was added, False if it was already in the set.
+        """
+        index = bisect_left(self._ids, userId)
+        if index < len(self._ids) and self._ids[index] == userId:
+            return False
+        self._ids.insert(index, userId)
+        return True
+
+    def update(self, userIds: Iterable[int]):
+        """Add many user IDs to the set at once."""
+        self._ids = array("q", sorted(set(self._ids).union(userIds)))
+
+    def pack(self) -> str:
+        """Pack the set into a base64 string of little-endian 64-bit integers."""
+        ids = array("q", self._ids)
+        if sys.byteorder != "little":
+            ids.byteswap()
+        return base64.b64encode(ids.tobytes()).decode("ascii")
+
+    @classmethod
+    def unpack(cls, data: str) -> "UserIdSet":
+        """Create a set from a string made by `pack`."""
+        ids = array("q")
+        ids.frombytes(base64.b64decode(data))
+        if sys.byteorder != "little":
+            ids.byteswap()
+        userIdSet = cls()
+        # The packed IDs are already sorted and unique.
+        userIdSet._ids = ids
+        return userIdSet
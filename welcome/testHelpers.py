@@ -0,0 +1,49 @@
+import base64
+
+from .helpers import UserIdSet
+
+
+class TestUserIdSet:
+    """Tests to ensure UserIdSet behaves like a set of user IDs."""
+
+    def testAddAndContains(self):
+        userIds = UserIdSet([3, 1, 2, 1])
+        assert list(userIds) == [1, 2, 3]
+        assert 2 in userIds
+        assert 4 not in userIds
+
+        assert userIds.add(4)
+        assert not userIds.add(2)
+        assert userIds.add(0)
+        assert list(userIds) == [0, 1, 2, 3, 4]
+        assert len(userIds) == 5
+
+    def testUpdate(self):
+        userIds = UserIdSet([5, 1])
+        userIds.update([3, 5, 2**62])
+        assert list(userIds) == [1, 3, 5, 2**62]
+
+    def testPackRoundTrip(self):
+        ids = [123456789012345678, 1, 2**63 - 1, 987654321098765432]
+        userIds = UserIdSet(ids)
+        unpacked = UserIdSet.unpack(userIds.pack())
+        assert list(unpacked) == sorted(ids)
+        assert 123456789012345678 in unpacked
+        assert unpacked.add(42)
+        assert list(unpacked) == sorted(ids + [42])
+
+    def testPackFormat(self):
+        packed = UserIdSet([2, 1]).pack()
+        assert base64.b64decode(packed) == (1).to_bytes(8, "little") + (2).to_bytes(8, "little")
+
+    def testUnpackEmpty(self):
+        userIds = UserIdSet.unpack(UserIdSet().pack())
+        assert len(userIds) == 0
+        assert UserIdSet().pack() == ""
+
+    def testLegacyMigration(self):
+        # Joined user IDs used to be saved as a list, which may have duplicates.
+        legacyUserIds = [30, 10, 20, 10]
+        userIds = UserIdSet.unpack(UserIdSet([20, 40]).pack())
+        userIds.update(legacyUserIds)
+        assert list(UserIdSet.unpack(userIds.pack())) == [10, 20, 30, 40]
@@ -6,6 +6,8 @@ import asyncio
 import discord
 import logging
 import random
+import time
+from collections import defaultdict, deque
 
 from redbot.core import Config, checks, commands
 from redbot.core.bot import Red
@@ -13,10 +15,10 @@ from redbot.core.commands.context import Context
 from redbot.core.utils.chat_formatting import box, info, pagify, warning
 from redbot.core.utils.menus import DEFAULT_CONTROLS, menu
 from redbot.core.utils import AsyncIter
-from typing import Optional
+from typing import DefaultDict, Deque, Dict, List, Optional, Set, Tuple
 
 from .constants import *
-from .helpers import createTagListPages
+from .helpers import UserIdSet, createTagListPages
 
 LOGGER = logging.getLogger("red.luicogs.Welcome")
 
@@ -29,6 +31,239 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
         self.bot = bot
         self.config = Config.get_conf(self, identifier=5842647, force_registration=True)
         self.config.register_guild(**DEFAULT_GUILD)
+        # Guild ID -> IDs of users that have joined, loaded from config on first use.
+        self.joinedUserIds: Dict[int, UserIdSet] = {}
+        # Guilds with joined user IDs that have not been saved to config yet.
+        self.dirtyJoinedUserIds: Set[int] = set()
+        self.joinedUserIdsLock = asyncio.Lock()
+        # Guild ID -> greeting pool -> greetings, loaded from config on first use.
+        self.greetingPools: DefaultDict[int, Dict[GreetingPools, Tuple[str, ...]]] = defaultdict(
+            dict
+        )
+        # Guild ID -> monotonic times of recent joins, for raid detection.
+        self.joinTimes: DefaultDict[int, Deque[float]] = defaultdict(deque)
+        # Guilds currently in raid mode.
+        self.raidGuilds: Set[int] = set()
+        # Guild ID -> greeting pool -> mentions of members to welcome in the next summary.
+        self.raidWelcomes: DefaultDict[int, Dict[GreetingPools, List[str]]] = defaultdict(dict)
+        # Channel ID -> log lines to post in the next summary.
+        self.raidLogLines: DefaultDict[int, List[str]] = defaultdict(list)
+        # Guild ID -> mentions of members whose queued welcome DM failed, to post in the
+        # next summary.
+        self.raidFailedDms: DefaultDict[int, List[str]] = defaultdict(list)
+        # Members waiting for a welcome DM during raid mode.
+        self.dmQueue: "asyncio.Queue[discord.Member]" = asyncio.Queue()
+        self.flushTask = self.bot.loop.create_task(self.flushLoop())
+        self.raidSummaryTask = self.bot.loop.create_task(self.raidSummaryLoop())
+        self.dmTask = self.bot.loop.create_task(self.dmSenderLoop())
+
+    async def cog_unload(self):
+        self.flushTask.cancel()
+        self.raidSummaryTask.cancel()
+        self.dmTask.cancel()
+        await self.flushJoinedUserIds()
+
+    async def flushLoop(self):
+        """Background loop to periodically save joined user IDs to config."""
+        while True:
+            await asyncio.sleep(JOINED_USERS_FLUSH_TIME)
+            try:
+                await self.flushJoinedUserIds()
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.error("Could not save joined user IDs", exc_info=True)
+
+    async def flushJoinedUserIds(self):
+        """Save the joined user IDs of guilds with new joins to config."""
+        dirty, self.dirtyJoinedUserIds = self.dirtyJoinedUserIds, set()
+        for guildId in dirty:
+            packed = self.joinedUserIds[guildId].pack()
+            guildConfig = self.config.guild_from_id(guildId)
+            await guildConfig.get_attr(KEY_JOINED_USER_IDS_PACKED).set(packed)
+
+    def recordJoin(self, guild: discord.Guild):
+        """Record a member join, and enter raid mode if the join rate is too high."""
+        now = time.monotonic()
+        joinTimes = self.joinTimes[guild.id]
+        joinTimes.append(now)
+        while joinTimes and now - joinTimes[0] > RAID_WINDOW:
+            joinTimes.popleft()
+
+        if guild.id not in self.raidGuilds and len(joinTimes) >= RAID_JOIN_THRESHOLD:
+            self.raidGuilds.add(guild.id)
+            LOGGER.warning(
+                "Entering raid mode for guild %s (%s): %s joins in %s seconds",
+                guild.name,
+                guild.id,
+                len(joinTimes),
+                RAID_WINDOW,
+            )
+
+    def isRaidMode(self, guild: discord.Guild) -> bool:
+        """Check whether join messages for a guild are being batched."""
+        return guild.id in self.raidGuilds
+
+    async def sendLog(self, channel: discord.TextChannel, message: str, batched: bool = False):
+        """Send a message to a log channel, or queue it for the next summary in raid mode.
+
+        If `batched` is set, the message is queued even if raid mode has ended.
+        """
+        if batched or self.isRaidMode(channel.guild):
+            self.raidLogLines[channel.id].append(message)
+        else:
+            await channel.send(message)
+
+    async def raidSummaryLoop(self):
+        """Background loop to post batched join messages, and leave raid mode."""
+        while True:
+            await asyncio.sleep(RAID_SUMMARY_INTERVAL)
+            try:
+                self.updateRaidMode()
+                await self.postRaidSummaries()
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.error("Could not post raid mode summaries", exc_info=True)
+
+    def updateRaidMode(self):
+        """Leave raid mode for guilds where the join rate has dropped."""
+        now = time.monotonic()
+        for guildId in list(self.raidGuilds):
+            joinTimes = self.joinTimes[guildId]
+            while joinTimes and now - joinTimes[0] > RAID_WINDOW:
+                joinTimes.popleft()
+            if len(joinTimes) < RAID_JOIN_THRESHOLD:
+                self.raidGuilds.discard(guildId)
+                LOGGER.info("Leaving raid mode for guild %s", guildId)
+
+    async def postRaidSummaries(self):
+        """Post the batched welcome and log messages."""
+        raidWelcomes, self.raidWelcomes = self.raidWelcomes, defaultdict(dict)
+        for guildId, pools in raidWelcomes.items():
+            guild = self.bot.get_guild(guildId)
+            if not guild:
+                continue
+            channelID = await self.config.guild(guild).get_attr(KEY_WELCOME_CHANNEL)()
+            channel = discord.utils.get(guild.channels, id=channelID)
+            if not channel:
+                continue
+            for pool, mentions in pools.items():
+                rawMessage = await self.getRandomMessage(guild, pool=pool)
+                message = rawMessage.replace("{USER}", ", ".join(mentions))
+                try:
+                    for page in pagify(message, delims=["\n", " "]):
+                        await channel.send(page)
+                except (discord.Forbidden, discord.HTTPException):
+                    LOGGER.error(
+                        "Could not send message, please make sure the bot "
+                        "has enough permissions to send messages to this "
+                        "channel!",
+                        exc_info=True,
+                    )
+                else:
+                    LOGGER.info(
+                        "Posted welcome message for %s users in guild %s.",
+                        len(mentions),
+                        guildId,
+                    )
+
+        raidFailedDms, self.raidFailedDms = self.raidFailedDms, defaultdict(list)
+        for guildId, mentions in raidFailedDms.items():
+            guild = self.bot.get_guild(guildId)
+            if not guild:
+                continue
+            welcomeEmbed = self.makeWelcomeEmbed(await self.config.guild(guild).all())
+            pages = list(
+                pagify(
+                    f"Hey {', '.join(mentions)}, we couldn't reach your DMs.\n"
+                    "The following is what we wanted to send to you.",
+                    delims=["\n", " "],
+                )
+            )
+            try:
+                for page in pages[:-1]:
+                    await self.sendToWelcomeChannel(guild, page)
+                await self.sendToWelcomeChannel(guild, pages[-1], embed=welcomeEmbed)
+            except ValueError:
+                LOGGER.error(
+                    "Could not send messages to the welcome channel! "
+                    "Please make sure welcome channel settings are "
+                    "well configured!",
+                    exc_info=True,
+                )
+            except (discord.Forbidden, discord.HTTPException):
+                LOGGER.error("Could not send batched failed DM messages", exc_info=True)
+
+        raidLogLines, self.raidLogLines = self.raidLogLines, defaultdict(list)
+        for channelId, lines in raidLogLines.items():
+            channel = self.bot.get_channel(channelId)
+            if not channel:
+                continue
+            try:
+                for page in pagify("\n".join(lines)):
+                    await channel.send(page)
+            except (discord.Forbidden, discord.HTTPException):
+                LOGGER.error("Could not send batched log messages", exc_info=True)
+
+    async def dmSenderLoop(self):
+        """Background loop to send queued welcome DMs at a limited rate."""
+        while True:
+            member = await self.dmQueue.get()
+            try:
+                await self.sendWelcomeMessage(member, batched=True)
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.error("Could not send queued welcome DM", exc_info=True)
+            await asyncio.sleep(RAID_DM_INTERVAL)
+
+    async def getJoinedUserIds(self, guild: discord.Guild) -> UserIdSet:
+        """Get the IDs of users that have joined a guild.
+
+        The IDs are loaded from config once, and then kept in memory. IDs from the
+        legacy list format are migrated to the packed format on first load.
+        """
+        userIds = self.joinedUserIds.get(guild.id)
+        if userIds is not None:
+            return userIds
+
+        async with self.joinedUserIdsLock:
+            # Another join may have loaded this guild while we were waiting.
+            userIds = self.joinedUserIds.get(guild.id)
+            if userIds is not None:
+                return userIds
+
+            guildConfig = self.config.guild(guild)
+            packed = await guildConfig.get_attr(KEY_JOINED_USER_IDS_PACKED)()
+            userIds = UserIdSet.unpack(packed)
+            legacyUserIds = await guildConfig.get_attr(KEY_JOINED_USER_IDS)()
+            if legacyUserIds:
+                LOGGER.info(
+                    "Migrating %s joined user IDs for guild %s", len(legacyUserIds), guild.id
+                )
+                userIds.update(legacyUserIds)
+                await guildConfig.get_attr(KEY_JOINED_USER_IDS_PACKED).set(userIds.pack())
+                await guildConfig.get_attr(KEY_JOINED_USER_IDS).clear()
+            self.joinedUserIds[guild.id] = userIds
+            return userIds
+
+    async def getGreetingPool(self, guild: discord.Guild, pool: GreetingPools) -> Tuple[str, ...]:
+        """Get the greetings in a greeting pool.
+
+        This is cached, and should be invalidated with `self.greetingPools.pop`
+        whenever the greetings of a guild change.
+
+        Parameters
+        ----------
+        guild: discord.Guild
+            The guild to get the greetings of.
+        pool: GreetingPools
+            The pool to get the greetings of.
+        """
+        guildPools = self.greetingPools[guild.id]
+        greetings = guildPools.get(pool)
+        if greetings is None:
+            key = KEY_GREETINGS
+            if pool == GreetingPools.RETURNING:
+                key = KEY_RETURNING_GREETINGS
+            greetings = tuple((await self.config.guild(guild).get_attr(key)()).values())
+            guildPools[pool] = greetings
+        return greetings
 
     async def getRandomMessage(self, guild: discord.Guild, pool: Optional[GreetingPools] = None):
         """Gets a random message from a greeting pool.
@@ -43,26 +278,26 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
         pool: Optional[GreetingPools]
             The pool to get a random greeting from.
         """
-        key = KEY_GREETINGS
-        if pool == GreetingPools.RETURNING:
-            key = KEY_RETURNING_GREETINGS
-
-        greetings = await self.config.guild(guild).get_attr(key)()
+        greetings = await self.getGreetingPool(guild, pool or GreetingPools.DEFAULT)
 
         if not greetings:
-            greetings = await self.config.guild(guild).get_attr(KEY_GREETINGS)()
+            greetings = await self.getGreetingPool(guild, GreetingPools.DEFAULT)
 
         if not greetings:
             return "Welcome to the server {USER}"
         else:
-            return random.choice(list(greetings.values()))
+            return random.choice(greetings)
 
     # The async function that is triggered on new member join.
     @commands.Cog.listener()
     async def on_member_join(self, newMember: discord.Member):
+        self.recordJoin(newMember.guild)
         await self.logServerJoin(newMember)
         await self.sendWelcomeMessageChannel(newMember)
-        await self.sendWelcomeMessage(newMember)
+        if self.isRaidMode(newMember.guild):
+            self.dmQueue.put_nowait(newMember)
+        else:
+            await self.sendWelcomeMessage(newMember)
         await self.sendLogUserDescription(newMember)
         await self.addToJoinedUserIds(newMember)
 
@@ -132,16 +367,17 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
         return await welcomeChannel.send(*args, **kwargs)
 
     async def addToJoinedUserIds(self, newUser: discord.Member):
-        """Adds the user's id to the list of joined users."""
-        async with self.config.guild(newUser.guild).get_attr(
-            KEY_JOINED_USER_IDS
-        )() as joinedUserIds:
-            if newUser.id not in joinedUserIds:
-                joinedUserIds.append(newUser.id)
+        """Adds the user's id to the set of joined users.
+
+        The set is saved to config periodically by `flushLoop`.
+        """
+        joinedUserIds = await self.getJoinedUserIds(newUser.guild)
+        if joinedUserIds.add(newUser.id):
+            self.dirtyJoinedUserIds.add(newUser.guild.id)
 
     async def isReturningUser(self, user: discord.Member):
         """Checks if the user is a returning user."""
-        return user.id in await self.config.guild(user.guild).get_attr(KEY_JOINED_USER_IDS)()
+        return user.id in await self.getJoinedUserIds(user.guild)
 
     async def sendWelcomeMessageChannel(self, newUser: discord.Member):
         """Sends a welcome message to the welcome channel if it is set."""
@@ -157,6 +393,11 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
         if await self.isReturningUser(newUser):
             greetingPool = GreetingPools.RETURNING
 
+        if self.isRaidMode(guild):
+            # welcome everyone together in the next raid summary
+            self.raidWelcomes[guild.id].setdefault(greetingPool, []).append(newUser.mention)
+            return
+
         rawMessage = await self.getRandomMessage(guild, pool=greetingPool)
 
         message = rawMessage.replace("{USER}", newUser.mention)
@@ -181,18 +422,28 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
 
         return
 
-    async def sendWelcomeMessage(self, newUser: discord.Member, test=False):
-        """Sends the welcome message in DM."""
+    def makeWelcomeEmbed(self, guildData: dict) -> discord.Embed:
+        """Makes the welcome DM embed from the guild settings."""
+        welcomeEmbed = discord.Embed(title=guildData[KEY_TITLE])
+        welcomeEmbed.description = guildData[KEY_MESSAGE]
+        welcomeEmbed.colour = discord.Colour.red()
+        if guildData[KEY_IMAGE]:
+            imageUrl = guildData[KEY_IMAGE]
+            welcomeEmbed.set_image(url=imageUrl.replace(" ", "%20"))
+        return welcomeEmbed
+
+    async def sendWelcomeMessage(self, newUser: discord.Member, test=False, batched=False):
+        """Sends the welcome message in DM.
+
+        If `batched` is set, as it is for DMs queued during raid mode, a failed DM is
+        posted in the welcome channel with the next raid summary instead of right away.
+        Test DMs are never batched.
+        """
         async with self.config.guild(newUser.guild).all() as guildData:
             if not guildData[KEY_DM_ENABLED]:
                 return
 
-            welcomeEmbed = discord.Embed(title=guildData[KEY_TITLE])
-            welcomeEmbed.description = guildData[KEY_MESSAGE]
-            welcomeEmbed.colour = discord.Colour.red()
-            if guildData[KEY_IMAGE]:
-                imageUrl = guildData[KEY_IMAGE]
-                welcomeEmbed.set_image(url=imageUrl.replace(" ", "%20"))
+            welcomeEmbed = self.makeWelcomeEmbed(guildData)
 
             channel = discord.utils.get(
                 newUser.guild.text_channels, id=guildData[KEY_LOG_JOIN_CHANNEL]
@@ -211,15 +462,19 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
                 LOGGER.error(errorMsg)
 
                 if guildData[KEY_LOG_JOIN_ENABLED] and not test and channel:
-                    await channel.send(
+                    await self.sendLog(
+                        channel,
                         f":bangbang: ``Server Welcome:`` User {newUser.mention} "
                         f"{newUser.name}#{newUser.discriminator} "
-                        f"({newUser.id}) has joined. Could not send DM!"
+                        f"({newUser.id}) has joined. Could not send DM!",
+                        batched=batched,
                     )
-                    await channel.send(errorMsg)
+                    await self.sendLog(channel, str(errorMsg), batched=batched)
 
                 doPostFailedDm = guildData[KEY_WELCOME_CHANNEL_SETTINGS][KEY_POST_FAILED_DM]
-                if doPostFailedDm and not test:
+                if doPostFailedDm and not test and batched:
+                    self.raidFailedDms[newUser.guild.id].append(newUser.mention)
+                elif doPostFailedDm and not test:
                     infoMsg = (
                         f"Hey {newUser.mention}, we couldn't reach your DMs.\n"
                         "The following is what we wanted to send to you."
@@ -267,7 +522,8 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
         if userId in descDict:
             descText: str = descDict[userId]
             if descText:
-                await logChannel.send(
+                await self.sendLog(
+                    logChannel,
                     "\n".join(
                         [
                             warning(
@@ -276,7 +532,7 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
                             ),
                             box(descText),
                         ]
-                    )
+                    ),
                 )
                 LOGGER.info(
                     "User %s#%s (%s) was tagged with a description. "
@@ -296,10 +552,11 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
                     joinUser.guild.text_channels, id=logJoinChannelId
                 )
                 if channel:
-                    await channel.send(
+                    await self.sendLog(
+                        channel,
                         f":white_check_mark: ``Server Welcome:`` User {joinUser.mention} "
                         f"{joinUser.name}#{joinUser.discriminator} "
-                        f"({joinUser.id}) has joined."
+                        f"({joinUser.id}) has joined.",
                     )
                 LOGGER.info(
                     "User %s#%s (%s) has joined server %s (%s).",
@@ -318,10 +575,11 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
                     leaveUser.guild.text_channels, id=guildData[KEY_LOG_LEAVE_CHANNEL]
                 )
                 if channel:
-                    await channel.send(
+                    await self.sendLog(
+                        channel,
                         f":x: ``Server Leave  :`` User {leaveUser.mention} "
                         f"{leaveUser.name}#{leaveUser.discriminator} "
-                        f"({leaveUser.id}) has left the server."
+                        f"({leaveUser.id}) has left the server.",
                     )
                 LOGGER.info(
                     "User %s#%s (%s) has left server %s (%s).",
@@ -549,6 +807,7 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
         greetings[name] = greeting.content
         await greeting.add_reaction("✅")
         await self.config.guild(ctx.guild).get_attr(key).set(greetings)
+        self.greetingPools.pop(ctx.guild.id, None)
         return
 
     # [p]welcomeset greetings channelset
@@ -691,6 +950,7 @@ class Welcome(commands.Cog):  # pylint: disable=too-many-instance-attributes
             greetings.pop(name, None)
             await ctx.send(f"{name} removed from list")
             await self.config.guild(ctx.guild).get_attr(key).set(greetings)
+            self.greetingPools.pop(ctx.guild.id, None)
         else:
             await ctx.send(f"{name} not in list of greetings")
         return